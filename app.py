@@ -2,17 +2,28 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import io
+import tempfile
 
 # --- Importar funciones desde regresion.py ---
 try:
     from regresion import (
         validar_datos,
+        parsear_valores,
         regresion_lineal,
-        correlacion_pearson,
         graficar_regresion,
+        figura_con_prediccion,
         predecir_valor,
-        COL_X, COL_Y, COL_PRED
+        predecir_lote,
+        regresion_multiple,
+        columnas_resultados, ordenar_filtrar, pagina_resultados, bloques_resultados,
+        COL_X, COL_Y, COL_PRED, FILAS_POR_PAGINA,
+        BACKENDS, BACKENDS_ROBUSTOS, BACKEND_POR_DEFECTO, REPLICAS_BOOTSTRAP
     )
+    from perfilado import SolicitudMemoria, etapa, iniciar_recoleccion, medir_memoria
+    from cache_resultados import cache_por_defecto
+    from trabajos import (CANCELADO, FALLIDO, TAM_BLOQUE, UMBRAL_BYTES_SEGUNDO_PLANO, UMBRAL_SEGUNDO_PLANO, GestorTrabajos, Trabajo,
+                          pipeline_archivo, pipeline_regresion)
+    from ingesta import TIPOS_SOPORTADOS, columnas_disponibles, exportar_bloques, leer_tabla, vista_previa
     REGRESION_PY_IMPORTED = True
 except ImportError as e:
     st.error(f"**Error Crítico:** No se pudo importar `regresion.py`. Detalles: {e}")
@@ -22,11 +33,75 @@ except ImportError as e:
 # --- Configuración de la Página e Inicialización del Estado ---
 st.set_page_config(page_title="Calculadora Regresión Lineal", page_icon="https://cdn-icons-png.flaticon.com/128/1998/1998646.png", layout="wide")
 
+@st.cache_resource
+def get_cache():
+    """Caché de resultados compartida por todas las sesiones del servidor."""
+    return cache_por_defecto()
+
+@st.cache_resource
+def get_gestor():
+    """Pool de trabajos en segundo plano compartido por el servidor (limita los cálculos simultáneos)."""
+    return GestorTrabajos()
+
+# Registros de perfilado de esta ejecución del script (por sesión)
+registros_perfil = iniciar_recoleccion()
+
+def aplicar_trabajo(trabajo):
+    """Copia al estado de la sesión el resultado de un trabajo terminado."""
+    st.session_state.diagnostico = list(trabajo.registros)
+    st.session_state.tabla_vista = None
+    avisos = []
+    if trabajo.estado == CANCELADO:
+        st.session_state.error_calculo = "Cálculo cancelado."
+    elif trabajo.estado == FALLIDO:
+        st.session_state.error_calculo = trabajo.error
+    elif trabajo.resultado['error_validacion']:
+        st.session_state.error_calculo = trabajo.resultado['error_validacion']
+        avisos.append(("error", f"Validación Fallida: {trabajo.resultado['error_validacion']}"))
+    else:
+        salida = trabajo.resultado
+        resultado = salida['resultado']
+        st.session_state.df = salida['df']
+        if resultado['error_corr']: avisos.append(("warning", f"Correlación: {resultado['error_corr']}"))
+        avisos += [("warning", aviso) for aviso in salida['avisos']]
+        st.session_state.correlacion = resultado['correlacion']
+        if resultado['error_reg']:
+            avisos.append(("error", f"Regresión Fallida: {resultado['error_reg']}"))
+            st.session_state.error_calculo = resultado['error_reg']
+        else:
+            st.session_state.predicciones_modelo = salida['predicciones']
+            st.session_state.pendiente = resultado['pendiente']
+            st.session_state.r2 = resultado['r2']
+            st.session_state.intercepcion = resultado['intercepcion']
+            st.session_state.modelo = resultado['modelo']
+            st.session_state.fig = resultado['fig']
+            st.session_state.inferencia = resultado['inferencia']
+            st.session_state.calculado = True
+    st.session_state.avisos_calculo = avisos
+
+@st.fragment(run_every=0.5)
+def panel_trabajo():
+    """Progreso del trabajo en segundo plano; al terminar aplica el resultado y recarga la app."""
+    trabajo = st.session_state.get('trabajo')
+    if trabajo is None: return
+    if trabajo.activo:
+        info = trabajo.estado_actual()
+        st.progress(info['progreso'], text=f"⏳ {info['mensaje']}")
+        if info['provisional']:
+            prov = info['provisional']
+            st.caption(f"Ajuste provisional con {prov['n']:,} puntos: m ≈ {prov['pendiente']:.4f}, "
+                       f"b ≈ {prov['intercepcion']:.4f}, R² ≈ {prov['r2']:.4f}")
+        if st.button("⛔ Cancelar cálculo", key="cancel_button"): trabajo.cancelar()
+    else:
+        aplicar_trabajo(trabajo)
+        st.session_state.trabajo = None
+        st.rerun()
+
 default_session_state = {
     'calculado': False, 'df': None, 'modelo': None, 'pendiente': None,
     'intercepcion': None, 'r2': None, 'correlacion': None, 'fig': None,
-    'predicciones_modelo': None, 'error_calculo': None,
-    'csv_x_col': None, 'csv_y_col': None
+    'predicciones_modelo': None, 'error_calculo': None, 'inferencia': None,
+    'csv_x_col': None, 'csv_y_col': None, 'diagnostico': None, 'avisos_calculo': [], 'tabla_vista': None
 }
 for key, default_value in default_session_state.items():
     if key not in st.session_state: st.session_state[key] = default_value
@@ -94,6 +169,7 @@ with tab1:
 
     datos_x_list = []
     datos_y_list = []
+    fuente_archivo = None   # (archivo, col_x, col_y): se lee por bloques dentro del cálculo
 
     # --- Entrada Manual (comas) ---
     if input_option == "Manual (comas)":
@@ -102,27 +178,21 @@ with tab1:
             x_input_text = st.text_area("Valores de X (separados por coma):", "15,14,17,16,15,16,15,13,17,16,16", height=150, key="x_manual", help="Ej: 1, 2.5, 3, ...")
         with col2:
             y_input_text = st.text_area("Valores de Y (separados por coma):", "2,0,3,4,3,4,3,1,4,3,5", height=150, key="y_manual", help="Misma cantidad que X.")
-        if x_input_text: datos_x_list = [val.strip() for val in x_input_text.strip().split(',') if val.strip()]
-        if y_input_text: datos_y_list = [val.strip() for val in y_input_text.strip().split(',') if val.strip()]
+        if x_input_text: datos_x_list = parsear_valores(x_input_text)
+        if y_input_text: datos_y_list = parsear_valores(y_input_text)
 
     # --- Subir Archivo CSV ---
     else: # Subir CSV
-        uploaded_file = st.file_uploader("Sube un archivo CSV", type=["csv"], key="csv_uploader")
+        uploaded_file = st.file_uploader("Sube un archivo CSV, Parquet o Arrow", type=TIPOS_SOPORTADOS, key="csv_uploader")
         if uploaded_file is not None:
-            # ... (código para cargar CSV sin cambios) ...
             try:
-                @st.cache_data
-                def load_csv(file):
-                    try: return pd.read_csv(file)
-                    except Exception: file.seek(0); return pd.read_csv(file, sep=';')
-                    except Exception: file.seek(0); return pd.read_csv(file, sep='\t')
-
-                df_input_preview = load_csv(uploaded_file)
-                st.success("CSV cargado.")
-                st.dataframe(df_input_preview.head(), use_container_width=True)
-                available_columns = df_input_preview.columns.tolist()
-                if len(available_columns) < 2: st.error("CSV debe tener al menos 2 columnas.")
+                df_input_preview, error_prev = vista_previa(uploaded_file)
+                available_columns, error_cols = columnas_disponibles(uploaded_file)
+                if error_prev or error_cols: st.error(f"❌ {error_prev or error_cols}")
+                elif len(available_columns) < 2: st.error("El archivo debe tener al menos 2 columnas.")
                 else:
+                    st.success("Archivo cargado.")
+                    st.dataframe(df_input_preview, use_container_width=True)
                     col1_csv, col2_csv = st.columns(2)
                     with col1_csv:
                         idx_x = available_columns.index(st.session_state.csv_x_col) if st.session_state.csv_x_col in available_columns else 0
@@ -135,58 +205,101 @@ with tab1:
 
                     if st.session_state.csv_x_col and st.session_state.csv_y_col:
                         if st.session_state.csv_x_col == st.session_state.csv_y_col: st.warning("⚠️ X e Y son la misma columna.")
-                        try:
-                            datos_x_list = df_input_preview[st.session_state.csv_x_col].astype(str).tolist()
-                            datos_y_list = df_input_preview[st.session_state.csv_y_col].astype(str).tolist()
-                        except Exception as e_csv:
-                             st.error(f"❌ Error al extraer datos del CSV: {e_csv}")
-                             datos_x_list, datos_y_list = [], []
+                        # Solo se leen las columnas elegidas, por bloques, al calcular
+                        fuente_archivo = (uploaded_file, st.session_state.csv_x_col, st.session_state.csv_y_col)
+
+                    # --- Modo lote: muchas columnas Y (o todos los pares) en una pasada ---
+                    with st.expander("🧮 Regresión por lotes (varias columnas)"):
+                        matriz_completa = st.checkbox("Matriz completa (todos los pares)", key="lote_matriz")
+                        columnas_lote = st.multiselect("Columnas:", available_columns,
+                                                       default=[c for c in available_columns if c != st.session_state.csv_x_col],
+                                                       key="lote_columnas")
+                        if st.button("Calcular lote", key="lote_button"):
+                            col_x_lote = None if matriz_completa else st.session_state.csv_x_col
+                            tabla_lote, error_lote = leer_tabla(uploaded_file, ([col_x_lote] if col_x_lote else []) + columnas_lote)
+                            if not error_lote:
+                                resumen_lote, error_lote = regresion_multiple(tabla_lote, col_x_lote, columnas_lote)
+                            if error_lote:
+                                st.error(f"❌ {error_lote}")
+                                st.session_state.lote_resumen = None
+                            else:
+                                st.session_state.lote_tabla = tabla_lote
+                                st.session_state.lote_resumen = resumen_lote
+
+                        if st.session_state.get('lote_resumen') is not None:
+                            resumen_lote = st.session_state.lote_resumen
+                            st.dataframe(resumen_lote, use_container_width=True, height=250, hide_index=True)
+                            pares = [f"{x} → {y}" for x, y in zip(resumen_lote['x'], resumen_lote['y'])]
+                            par = st.selectbox("Ver gráfico del par:", range(len(pares)), format_func=pares.__getitem__, key="lote_par")
+                            fila = resumen_lote.iloc[par]
+                            datos_par = st.session_state.lote_tabla[[fila['x'], fila['y']]].dropna()
+                            df_par, error_par = validar_datos(datos_par[fila['x']].to_numpy(), datos_par[fila['y']].to_numpy())
+                            if error_par: st.warning(f"⚠️ {error_par}")
+                            else:
+                                preds_par, _, r2_par, _, _, error_par = regresion_lineal(df_par)
+                                fig_par = graficar_regresion(df_par, preds_par, r2_par) if not error_par else None
+                                if fig_par: st.plotly_chart(fig_par, use_container_width=True)
+                                else: st.warning(f"⚠️ {error_par or 'Gráfico no disponible.'}")
             except Exception as e:
-                st.error(f"❌ Error al procesar CSV: {e}")
+                st.error(f"❌ Error al procesar archivo: {e}")
 
 
     st.divider()
 
+    # --- Método de ajuste ---
+    NOMBRES_METODO = {"numpy": "Mínimos cuadrados", "sklearn": "Mínimos cuadrados (sklearn)",
+                      "theil_sen": "Theil–Sen (robusto)", "ransac": "RANSAC (robusto)", "huber": "Huber (robusto)"}
+    metodo = st.selectbox("Método de ajuste:", list(BACKENDS), index=list(BACKENDS).index(BACKEND_POR_DEFECTO),
+                          format_func=lambda b: NOMBRES_METODO.get(b, b), key="metodo_ajuste",
+                          help="Los métodos robustos reducen el efecto de los outliers.")
+    usar_bootstrap = st.checkbox(f"Intervalos bootstrap ({REPLICAS_BOOTSTRAP:,} réplicas, más lento)", key="usar_bootstrap",
+                                 disabled=metodo in BACKENDS_ROBUSTOS,
+                                 help="Los errores estándar e intervalos t se calculan siempre; el bootstrap es opcional.")
+
     # --- Botón para Calcular ---
-    if st.button("🚀 Calcular Regresión Lineal", key="calculate_button", use_container_width=True):
-        # ... (código de resetear estado y validación/cálculo sin cambios) ...
+    calculo_ejecutado = st.button("🚀 Calcular Regresión Lineal", key="calculate_button", use_container_width=True)
+    if calculo_ejecutado:
         for key in default_session_state:
             if key not in ['csv_x_col', 'csv_y_col']: st.session_state[key] = default_session_state[key]
         st.session_state.error_calculo = None
-
-        if not datos_x_list or not datos_y_list:
+        # Un nuevo cálculo reemplaza (y cancela) al que la sesión tuviera en curso
+        if st.session_state.get('trabajo') is not None: st.session_state.trabajo.cancelar()
+        st.session_state.trabajo = None
+
+        argumentos_calculo = None
+        if fuente_archivo is not None:
+            archivo_calc, col_x_calc, col_y_calc = fuente_archivo
+            # Copia con su propia posición (comparte los bytes): la interfaz sigue leyendo el archivo subido
+            copia_archivo = io.BytesIO(archivo_calc.getvalue())
+            copia_archivo.name = archivo_calc.name
+            argumentos_calculo = (pipeline_archivo, copia_archivo, col_x_calc, col_y_calc, metodo, get_cache(), TAM_BLOQUE, usar_bootstrap)
+            en_segundo_plano = archivo_calc.size >= UMBRAL_BYTES_SEGUNDO_PLANO
+        elif len(datos_x_list) == 0 or len(datos_y_list) == 0:
             st.warning("⚠️ Ingresa o carga datos válidos para X e Y.")
             st.session_state.error_calculo = "Datos insuficientes."
         else:
-            df_validado, error_val = validar_datos(datos_x_list, datos_y_list)
-            if error_val:
-                st.error(f"❌ Validación Fallida: {error_val}")
-                st.session_state.error_calculo = error_val
-            else:
-                st.session_state.df = df_validado
-                corr, error_corr = correlacion_pearson(st.session_state.df[COL_X].tolist(), st.session_state.df[COL_Y].tolist())
-                if error_corr: st.warning(f"⚠️ Correlación: {error_corr}")
-                st.session_state.correlacion = corr
-
-                preds, pend, r2_val, intercep, mod, error_reg = regresion_lineal(st.session_state.df)
-                if error_reg:
-                    st.error(f"❌ Regresión Fallida: {error_reg}")
-                    st.session_state.error_calculo = error_reg
-                else:
-                    st.session_state.predicciones_modelo = preds
-                    st.session_state.pendiente = pend
-                    st.session_state.r2 = r2_val
-                    st.session_state.intercepcion = intercep
-                    st.session_state.modelo = mod
-                    figura = graficar_regresion(st.session_state.df, preds, r2_val)
-                    st.session_state.fig = figura
-                    st.session_state.calculado = True
+            argumentos_calculo = (pipeline_regresion, datos_x_list, datos_y_list, metodo, get_cache(), TAM_BLOQUE, usar_bootstrap)
+            en_segundo_plano = len(datos_x_list) >= UMBRAL_SEGUNDO_PLANO
+
+        if argumentos_calculo is not None and not en_segundo_plano:
+            # Datos pequeños: se calcula en esta misma ejecución
+            trabajo = Trabajo("cálculo")
+            trabajo.ejecutar(*argumentos_calculo)
+            aplicar_trabajo(trabajo)
+        elif argumentos_calculo is not None:
+            st.session_state.trabajo = get_gestor().enviar(*argumentos_calculo, descripcion="cálculo")
+
+    if st.session_state.get('trabajo') is not None:
+        panel_trabajo()
 
 
     st.divider()
 
     # --- SECCIÓN DE RESULTADOS ---
     st.markdown("<div class='sub-header'>Resultados del Análisis</div>", unsafe_allow_html=True)
+    for tipo_aviso, aviso in st.session_state.get('avisos_calculo') or []:
+        if tipo_aviso == "error": st.error(f"❌ {aviso}")
+        else: st.warning(f"⚠️ {aviso}")
 
     if st.session_state.get('calculado', False):
         col_res1, col_res2 = st.columns([1, 1.5]) # Ajustar ratio si es necesario
@@ -218,6 +331,19 @@ with tab1:
                                  </div>""", unsafe_allow_html=True)
                 # --- FIN DEL CAMBIO ---
 
+                # Incertidumbre: errores estándar e intervalos (t y bootstrap)
+                inf = st.session_state.inferencia
+                if inf:
+                    nivel_pct = f"{inf['nivel']:.0%}"
+                    lineas_inf = [
+                        f"EE(m) = {inf['se_pendiente']:.4f} · IC {nivel_pct} t: [{inf['ic_t_pendiente'][0]:.4f}, {inf['ic_t_pendiente'][1]:.4f}]",
+                        f"EE(b) = {inf['se_intercepcion']:.4f} · IC {nivel_pct} t: [{inf['ic_t_intercepcion'][0]:.4f}, {inf['ic_t_intercepcion'][1]:.4f}]",
+                    ]
+                    if 'ic_boot_pendiente' in inf:
+                        lineas_inf.append(f"Bootstrap ({inf['replicas']:,} réplicas) m: [{inf['ic_boot_pendiente'][0]:.4f}, {inf['ic_boot_pendiente'][1]:.4f}] · "
+                                          f"R²: [{inf['ic_boot_r2'][0]:.4f}, {inf['ic_boot_r2'][1]:.4f}]")
+                    st.caption("  \n".join(lineas_inf))
+
                 # Ecuación en LaTeX (más grande)
                 if st.session_state.pendiente is not None and st.session_state.intercepcion is not None:
                     m = st.session_state.pendiente
@@ -230,46 +356,114 @@ with tab1:
                     st.latex(latex_eq)
                     st.markdown("</div>", unsafe_allow_html=True)
 
+            stats_cache = get_cache().estadisticas()
+            st.caption(f"Caché: {stats_cache['aciertos']} aciertos ({stats_cache['aciertos_disco']} de disco) · "
+                       f"{stats_cache['fallos']} fallos · {stats_cache['entradas']} entradas "
+                       f"({stats_cache['bytes'] / 1e6:.1f} MB)")
+
             st.markdown("##### 🔮 Predicción")
             # ... (código de predicción sin cambios) ...
             with st.container(border=True):
+                prediccion_overlay = None
                 nuevo_valor_x = st.number_input("Valor de X para predecir:", value=None, step=1.0, format="%.4f", placeholder="Escribe un número...", label_visibility="collapsed")
                 if nuevo_valor_x is not None:
                     prediccion, error_pred = predecir_valor(st.session_state.modelo, nuevo_valor_x)
                     if error_pred: st.error(f"❌ {error_pred}")
                     elif prediccion is not None:
                          st.success(f"Para X = {nuevo_valor_x:.4f}, Y predicho ≈ **{prediccion:.4f}**")
-                         st.session_state.last_prediction = {'x': nuevo_valor_x, 'y': prediccion}
+                         prediccion_overlay = (nuevo_valor_x, prediccion)
                 else:
                     st.caption("Ingresa un valor de X para predecir.")
 
+            with st.expander("📦 Predicción masiva (archivo)"):
+                archivo_pred = st.file_uploader("Archivo con valores de X", type=TIPOS_SOPORTADOS, key="pred_uploader")
+                if archivo_pred is not None:
+                    columnas_pred, error_cols_pred = columnas_disponibles(archivo_pred)
+                    if error_cols_pred: st.error(f"❌ {error_cols_pred}")
+                    else:
+                        col_pred = st.selectbox("Columna X:", columnas_pred, key="pred_col_select")
+                        formato_pred = st.radio("Formato de salida:", ["csv", "parquet"], horizontal=True, key="pred_formato")
+                        if st.button("Predecir archivo", key="pred_button"):
+                            bloques_pred, error_lote = predecir_lote(st.session_state.modelo, archivo_pred, columna=col_pred)
+                            if error_lote: st.error(f"❌ {error_lote}")
+                            else:
+                                # Se escribe bloque a bloque en un temporal; nunca se arma la tabla completa.
+                                # download_button no acepta el objeto del temporal: recibe sus bytes
+                                conteo = {'invalidos': 0}
+                                def _filas():
+                                    for x_b, pred_b, valido_b in bloques_pred:
+                                        conteo['invalidos'] += int((~valido_b).sum())
+                                        yield {COL_X: x_b, COL_PRED: pred_b}
+                                with tempfile.TemporaryFile() as salida_pred:
+                                    filas_pred, error_exp = exportar_bloques(_filas(), salida_pred, formato_pred)
+                                    salida_pred.seek(0)
+                                    datos_pred = None if error_exp else salida_pred.read()
+                                if error_exp: st.error(f"❌ {error_exp}")
+                                else:
+                                    st.success(f"{filas_pred:,} predicciones ({conteo['invalidos']:,} valores inválidos como vacío).")
+                                    st.download_button("⬇️ Descargar predicciones", data=datos_pred,
+                                                       file_name=f"predicciones.{formato_pred}", key="pred_download")
+
 
         with col_res2: # Gráfico y Datos
             # ... (código del gráfico y tabla sin cambios) ...
             st.markdown("##### 📈 Gráfico")
             if st.session_state.fig:
-                fig_display = st.session_state.fig
-                if 'last_prediction' in st.session_state and st.session_state.last_prediction:
-                     try:
-                         pred_info = st.session_state.last_prediction
-                         st.session_state.fig.add_scatter(
-                             x=[pred_info['x']], y=[pred_info['y']], mode='markers',
-                             marker=dict(color='purple', size=12, symbol='star'), name=f'Predicción ({pred_info["x"]:.2f})' )
-                         fig_display = st.session_state.fig
-                     except Exception as e: print(f"Warn: No se pudo añadir punto pred: {e}")
-                st.plotly_chart(fig_display, use_container_width=True)
-                if 'last_prediction' in st.session_state: del st.session_state.last_prediction
+                # La predicción va en una copia de la figura; sin predicción se muestra la base tal cual
+                fig_display = figura_con_prediccion(st.session_state.fig, *prediccion_overlay) if prediccion_overlay else st.session_state.fig
+                with etapa("render_grafico"):
+                    st.plotly_chart(fig_display, use_container_width=True)
             else: st.warning("⚠️ Gráfico no disponible.")
 
             st.markdown("##### 💾 Datos")
             if st.session_state.df is not None:
-                df_display = st.session_state.df.copy()
-                if st.session_state.predicciones_modelo is not None:
-                     df_display[COL_PRED] = st.session_state.predicciones_modelo
-                try:
-                    for col in df_display.select_dtypes(include=np.number).columns: df_display[col] = df_display[col].map('{:.4f}'.format)
-                except Exception: pass
-                st.dataframe(df_display, use_container_width=True, height=200)
+                columnas_tabla = columnas_resultados(st.session_state.df, st.session_state.predicciones_modelo)
+                nombres_tabla = list(columnas_tabla)
+                total_filas = len(st.session_state.df)
+                col_orden, col_desc = st.columns([3, 1])
+                orden = col_orden.selectbox("Ordenar por:", [None] + nombres_tabla, key="tabla_orden",
+                                            format_func=lambda c: "(orden original)" if c is None else c)
+                descendente = col_desc.checkbox("Descendente", key="tabla_desc", disabled=orden is None)
+                col_filtro, col_min, col_max = st.columns([2, 1, 1])
+                col_filtrada = col_filtro.selectbox("Filtrar:", [None] + nombres_tabla, key="tabla_filtro",
+                                                    format_func=lambda c: "(sin filtro)" if c is None else c)
+                minimo = col_min.number_input("Mínimo", value=None, format="%.4f", key="tabla_min", disabled=col_filtrada is None)
+                maximo = col_max.number_input("Máximo", value=None, format="%.4f", key="tabla_max", disabled=col_filtrada is None)
+                filtro = (col_filtrada, minimo, maximo) if col_filtrada is not None else None
+
+                # Orden y filtro se hacen sobre los arrays y se guardan: cambiar de página no los repite
+                clave_vista = (orden, descendente, filtro)
+                vista = st.session_state.tabla_vista
+                if vista is None or vista[0] != clave_vista:
+                    with etapa("ordenar_tabla", total_filas):
+                        indices, error_vista = ordenar_filtrar(columnas_tabla, orden, descendente, filtro)
+                    if error_vista: st.error(f"❌ {error_vista}")
+                    vista = (clave_vista, indices if indices is not None else np.arange(total_filas))
+                    st.session_state.tabla_vista = vista
+                indices = vista[1]
+
+                paginas = max(1, -(-len(indices) // FILAS_POR_PAGINA))
+                pagina = st.number_input(f"Página (de {paginas:,}):", min_value=1, max_value=paginas, value=1, step=1, key="tabla_pagina")
+                pagina = min(pagina, paginas) - 1
+                with etapa("render_tabla", FILAS_POR_PAGINA):
+                    st.dataframe(pagina_resultados(columnas_tabla, indices, pagina), use_container_width=True, height=200)
+                inicio_pag = pagina * FILAS_POR_PAGINA
+                st.caption(f"Filas {min(inicio_pag + 1, len(indices)):,}–{min(inicio_pag + FILAS_POR_PAGINA, len(indices)):,} "
+                           f"de {len(indices):,} visibles ({total_filas:,} en total).")
+
+                with st.expander("⬇️ Exportar resultados completos"):
+                    formato_tabla = st.radio("Formato:", ["csv", "parquet"], horizontal=True, key="tabla_formato")
+                    if st.button("Preparar archivo", key="tabla_exportar"):
+                        # Se escribe por bloques en un temporal: la tabla completa nunca se arma ni se formatea
+                        with tempfile.TemporaryFile() as salida_tabla:
+                            with etapa("exportar_tabla", total_filas):
+                                filas_exp, error_exp = exportar_bloques(bloques_resultados(columnas_tabla), salida_tabla, formato_tabla)
+                            salida_tabla.seek(0)
+                            datos_tabla = None if error_exp else salida_tabla.read()
+                        if error_exp: st.error(f"❌ {error_exp}")
+                        else:
+                            st.download_button(f"⬇️ Descargar {filas_exp:,} filas", data=datos_tabla,
+                                               file_name=f"resultados_regresion.{formato_tabla}", key="tabla_descargar")
             else: st.caption("No hay datos procesados.")
 
 
@@ -279,6 +473,27 @@ with tab1:
     else:
          st.info("ℹ️ Ingresa datos y haz clic en 'Calcular Regresión Lineal' para ver los resultados.")
 
+    # --- Panel de diagnóstico (tiempos y memoria por etapa) ---
+    with st.expander("🩺 Diagnóstico de rendimiento"):
+        medir_mem = st.checkbox("Medir memoria asignada (tracemalloc, más lento; afecta a todo el servidor)", key="diag_memoria")
+        # Cuenta por sesión: desmarcarlo aquí no apaga la medición que pidió otra sesión
+        if 'solicitud_memoria' not in st.session_state: st.session_state.solicitud_memoria = SolicitudMemoria()
+        medir_memoria(medir_mem, st.session_state.solicitud_memoria)
+        filas_diag = [dict(r, origen="cálculo") for r in (st.session_state.diagnostico or [])]
+        filas_diag += [dict(r, origen="esta ejecución") for r in registros_perfil]
+        if filas_diag:
+            df_diag = pd.DataFrame(filas_diag)
+            df_diag["ms"] = df_diag["segundos"] * 1000
+            df_diag["MB"] = df_diag["bytes_asignados"].astype(float) / 1e6
+            df_diag["MB aprox."] = df_diag["memoria_aproximada"].eq(True) if "memoria_aproximada" in df_diag else False
+            st.dataframe(df_diag[["origen", "etapa", "ms", "MB", "MB aprox.", "filas", "nivel"]],
+                         use_container_width=True, hide_index=True)
+            if df_diag["MB aprox."].any():
+                st.caption("MB aprox.: otra sesión o trabajo medía memoria a la vez (tracemalloc es global al proceso).")
+        else:
+            st.caption("Sin mediciones todavía.")
+        st.caption("Define `REGRESION_PERFILADO_LOG=1` para registrar cada etapa como JSON en stderr.")
+
 # ==========================
 # PESTAÑA 2: GUÍA RÁPIDA
 # ==========================
@@ -303,5 +518,5 @@ with tab2:
     ### ⚠️ Importante
     *   Asume relación **lineal**.
     *   **Correlación ≠ Causalidad.**
-    *   **Outliers** pueden afectar.
+    *   **Outliers** pueden afectar. Para datos con outliers elige un método robusto (**Theil–Sen**, **RANSAC** o **Huber**) en "Método de ajuste".
     """)
@@ -0,0 +1,147 @@
+# benchmark.py - Mide cada etapa de regresion.py para distintos tamaños y backends
+# Uso:
+#   python benchmark.py                                  # 10 .. 10^7 puntos
+#   python benchmark.py --max 1e5 --salida base.json     # corrida rápida
+#   python benchmark.py --referencia base.json           # falla si alguna etapa empeora
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import regresion
+
+TAMANOS = [10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+REPETICIONES = 3
+TOLERANCIA = 1.5          # Factor máximo de empeoramiento frente a la referencia
+MINIMO_S = 0.005          # Diferencias por debajo de esto se consideran ruido
+MAX_TEXTO = 1_000_000     # parsear_valores solo hasta este tamaño (el texto ocupa mucha memoria)
+SEMILLA = 0
+
+
+def datos_sinteticos(n: int) -> tuple[np.ndarray, np.ndarray]:
+    """X uniforme e Y lineal con ruido y un 0.1% de outliers (semilla fija)."""
+    rng = np.random.default_rng(SEMILLA)
+    x = rng.uniform(0, 100, n)
+    y = 2.5 * x + 10 + rng.normal(0, 5, n)
+    outliers = rng.choice(n, size=max(n // 1000, 1), replace=False)
+    y[outliers] += rng.normal(0, 200, outliers.size)
+    return x, y
+
+
+def medir(funcion, repeticiones: int = REPETICIONES) -> tuple[float, int, object]:
+    """Mejor tiempo de pared (s), pico de memoria (bytes) y el resultado de la última llamada."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    # El pico de memoria se mide aparte: tracemalloc ralentiza la ejecución
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico, resultado
+
+
+def backends_disponibles() -> list:
+    disponibles = []
+    for nombre in regresion.BACKENDS:
+        df, _ = regresion.validar_datos(np.arange(3.0), np.arange(3.0))
+        if regresion.regresion_lineal(df, backend=nombre)[-1] is None:
+            disponibles.append(nombre)
+    return disponibles
+
+
+def correr(tamanos: list, repeticiones: int) -> list:
+    resultados = []
+    backends = backends_disponibles()
+
+    def registrar(etapa: str, n: int, funcion, backend: str | None = None, extra=None):
+        segundos, pico, salida = medir(funcion, repeticiones)
+        fila = {"etapa": etapa, "n": n, "backend": backend, "segundos": segundos, "pico_bytes": pico}
+        if extra:
+            fila.update(extra(salida))
+        resultados.append(fila)
+        nombre = f"{etapa}[{backend}]" if backend else etapa
+        print(f"{nombre:32} n={n:>10,}  {segundos * 1000:10.2f} ms  {pico / 1e6:9.1f} MB", flush=True)
+        return salida
+
+    for n in tamanos:
+        x, y = datos_sinteticos(n)
+        if n <= MAX_TEXTO:
+            texto = ",".join(map(repr, x.tolist()))
+            registrar("parsear_valores", n, lambda: regresion.parsear_valores(texto))
+            del texto
+        df, error = registrar("validar_datos", n, lambda: regresion.validar_datos(x, y))
+        if error:
+            raise RuntimeError(error)
+        registrar("correlacion_pearson", n, lambda: regresion.correlacion_pearson(x, y))
+        ajuste = None
+        for backend in backends:
+            salida = registrar("regresion_lineal", n, lambda: regresion.regresion_lineal(df, backend=backend), backend)
+            ajuste = ajuste or salida
+        preds, _, r2, _, modelo, _ = ajuste
+        registrar("predecir_valor", n, lambda: regresion.predecir_valor(modelo, 42.0))
+        registrar("predecir_lote", n, lambda: [b for b in regresion.predecir_lote(modelo, x)[0]])
+        registrar("intervalos_confianza", n, lambda: regresion.intervalos_confianza(df))
+        registrar("intervalos_bootstrap", n,
+                  lambda: regresion.intervalos_confianza(df, replicas=regresion.REPLICAS_BOOTSTRAP))
+        registrar("graficar_regresion", n, lambda: regresion.graficar_regresion(df, preds, r2),
+                  extra=lambda fig: {"figura_bytes": len(fig.to_json()) if fig is not None else None})
+    return resultados
+
+
+def comparar(resultados: list, referencia: list, tolerancia: float) -> list:
+    """Etapas cuyo tiempo supera al de la referencia más allá de la tolerancia."""
+    base = {(r["etapa"], r["n"], r["backend"]): r for r in referencia}
+    regresiones = []
+    for fila in resultados:
+        ref = base.get((fila["etapa"], fila["n"], fila["backend"]))
+        if ref is None:
+            continue
+        limite = max(ref["segundos"] * tolerancia, ref["segundos"] + MINIMO_S)
+        if fila["segundos"] > limite:
+            regresiones.append({**fila, "referencia_segundos": ref["segundos"]})
+    return regresiones
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de las etapas de regresion.py.")
+    parser.add_argument("--max", type=float, default=max(TAMANOS), help="Tamaño máximo a medir.")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--salida", default="bench_output.json", help="Archivo JSON de resultados.")
+    parser.add_argument("--referencia", help="JSON de una corrida anterior para detectar empeoramientos.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    tamanos = [n for n in TAMANOS if n <= args.max]
+    resultados = correr(tamanos, args.repeticiones)
+    informe = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.referencia:
+        with open(args.referencia, encoding="utf-8") as f:
+            referencia = json.load(f)["resultados"]
+        regresiones = comparar(resultados, referencia, args.tolerancia)
+        for r in regresiones:
+            print(f"EMPEORÓ {r['etapa']} n={r['n']:,} [{r['backend']}]: "
+                  f"{r['referencia_segundos'] * 1000:.2f} ms -> {r['segundos'] * 1000:.2f} ms")
+        if regresiones:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
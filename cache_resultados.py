@@ -0,0 +1,136 @@
+# cache_resultados.py - Caché de resultados direccionada por contenido (LRU + disco opcional)
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_BYTES_MEMORIA = 256 * 1024 * 1024   # Límite del nivel en memoria
+MAX_BYTES_DISCO = 2 * 1024 * 1024 * 1024
+VAR_DIRECTORIO = "REGRESION_CACHE_DIR"    # Si está definida, activa el nivel en disco
+
+
+def clave_datos(X, Y, **opciones) -> str:
+    """Hash del contenido de X e Y más las opciones del cálculo."""
+    h = hashlib.blake2b(digest_size=20)
+    for datos in (X, Y):
+        arr = np.ascontiguousarray(datos, dtype=np.float64)
+        h.update(arr.size.to_bytes(8, "little"))
+        h.update(memoryview(arr).cast("B"))
+    h.update(repr(sorted(opciones.items())).encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """Caché LRU limitada por bytes, con un segundo nivel opcional en disco.
+
+    Los valores se guardan serializados (pickle): así el tamaño es exacto y
+    quien lee recibe siempre una copia que puede modificar sin afectar a otros.
+    Es segura entre hilos, por lo que se puede compartir entre sesiones.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES_MEMORIA, directorio: str | None = None,
+                 max_bytes_disco: int = MAX_BYTES_DISCO):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self._entradas: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.pkl")
+
+    def _guardar_memoria(self, clave: str, datos: bytes):
+        if len(datos) > self.max_bytes:
+            return
+        if clave in self._entradas:
+            self._bytes -= len(self._entradas.pop(clave))
+        self._entradas[clave] = datos
+        self._bytes += len(datos)
+        while self._bytes > self.max_bytes:
+            _, viejo = self._entradas.popitem(last=False)
+            self._bytes -= len(viejo)
+
+    def obtener(self, clave: str):
+        """Valor guardado para `clave` o None si no está."""
+        with self._lock:
+            datos = self._entradas.get(clave)
+            if datos is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return pickle.loads(datos)
+            if self.directorio:
+                try:
+                    with open(self._ruta(clave), "rb") as f:
+                        datos = f.read()
+                    os.utime(self._ruta(clave))  # Marca de uso para la expulsión LRU en disco
+                    self._guardar_memoria(clave, datos)
+                    self.aciertos += 1
+                    self.aciertos_disco += 1
+                    return pickle.loads(datos)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    pass
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave: str, valor):
+        """Guarda `valor` (debe ser serializable con pickle)."""
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._guardar_memoria(clave, datos)
+            if self.directorio:
+                try:
+                    temporal = self._ruta(clave) + ".tmp"
+                    with open(temporal, "wb") as f:
+                        f.write(datos)
+                    os.replace(temporal, self._ruta(clave))
+                    self._podar_disco()
+                except OSError as e:
+                    print(f"Warn: No se pudo escribir caché en disco: {e}")
+
+    def _podar_disco(self):
+        """Borra los archivos menos usados hasta quedar bajo max_bytes_disco."""
+        archivos = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith(".pkl"):
+                info = entrada.stat()
+                archivos.append((info.st_mtime, info.st_size, entrada.path))
+        total = sum(tam for _, tam, _ in archivos)
+        for _, tam, ruta in sorted(archivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(ruta)
+                total -= tam
+            except OSError:
+                pass
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+            }
+
+
+def cache_por_defecto() -> CacheResultados:
+    """Caché configurada desde el entorno (nivel en disco si existe REGRESION_CACHE_DIR)."""
+    return CacheResultados(directorio=os.environ.get(VAR_DIRECTORIO) or None)
@@ -0,0 +1,142 @@
+# cli.py - Ajuste por lotes de muchos archivos sin Streamlit
+# Uso:
+#   python cli.py "exports/*.csv" datos/ --x tiempo --y valor --salida informe.parquet
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingesta import TAM_CHUNK, TIPOS_SOPORTADOS, columnas_disponibles, iterar_columnas
+from regresion import ajuste_streaming, nucleos_disponibles
+
+CAMPOS = ["archivo", "n", "pendiente", "intercepcion", "r2", "correlacion", "error_estandar",
+          "filas_omitidas", "segundos", "error"]
+
+
+def expandir_rutas(patrones: list, extensiones: list = TIPOS_SOPORTADOS) -> list:
+    """Archivos que coinciden con los globs o están dentro de los directorios (recursivo)."""
+    archivos = []
+    sufijos = tuple(f".{e.lower()}" for e in extensiones)
+    for patron in patrones:
+        if os.path.isdir(patron):
+            for raiz, _, nombres in os.walk(patron):
+                archivos.extend(os.path.join(raiz, n) for n in nombres if n.lower().endswith(sufijos))
+        else:
+            archivos.extend(r for r in glob.glob(patron, recursive=True) if os.path.isfile(r))
+    return sorted(dict.fromkeys(archivos))
+
+
+def _bloques_validos(bloques, omitir_invalidos: bool, contador: list):
+    """Filtra (o rechaza) filas con valores no numéricos o no finitos en cada bloque."""
+    for x, y in bloques:
+        validos = np.isfinite(x) & np.isfinite(y)
+        if not validos.all():
+            if not omitir_invalidos:
+                raise ValueError(f"{int((~validos).sum())} filas con valores no numéricos o no finitos.")
+            contador[0] += int((~validos).sum())
+            x, y = x[validos], y[validos]
+        yield x, y
+
+
+def ajustar_archivo(ruta: str, col_x: str, col_y: str, chunksize: int = TAM_CHUNK,
+                    omitir_invalidos: bool = False) -> dict:
+    """Ajusta un archivo leyendo por bloques; los errores quedan en el campo 'error'."""
+    inicio = time.perf_counter()
+    fila = dict.fromkeys(CAMPOS)
+    fila["archivo"] = ruta
+    omitidas = [0]
+    # Los bloques se leen de forma perezosa: el archivo y las columnas se comprueban antes
+    resumen = None
+    disponibles, error = columnas_disponibles(ruta)
+    faltantes = [c for c in (col_x, col_y) if c not in (disponibles or [])]
+    if error is None and faltantes:
+        error = f"Columna '{faltantes[0]}' no encontrada en el archivo."
+    if error is None:
+        bloques = _bloques_validos(iterar_columnas(ruta, col_x, col_y, chunksize), omitir_invalidos, omitidas)
+        resumen, error = ajuste_streaming(bloques)
+    if resumen:
+        fila.update({k: resumen[k] for k in resumen if k in fila})
+    fila["filas_omitidas"] = omitidas[0]
+    fila["error"] = error
+    fila["segundos"] = round(time.perf_counter() - inicio, 6)
+    return fila
+
+
+def _ajustar_args(args: tuple) -> dict:
+    return ajustar_archivo(*args)
+
+
+def ajustar_archivos(archivos: list, col_x: str, col_y: str, procesos: int | None = None,
+                     chunksize: int = TAM_CHUNK, omitir_invalidos: bool = False):
+    """Genera el resultado de cada archivo (en orden) usando un pool de procesos."""
+    procesos = procesos or nucleos_disponibles()
+    tareas = [(ruta, col_x, col_y, chunksize, omitir_invalidos) for ruta in archivos]
+    if procesos <= 1 or len(tareas) <= 1:
+        yield from map(_ajustar_args, tareas)
+        return
+    with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+        # Lotes de tareas por envío: con miles de archivos pequeños reduce el costo de IPC
+        lote = max(1, len(tareas) // (procesos * 8))
+        yield from pool.map(_ajustar_args, tareas, chunksize=lote)
+
+
+def escribir_informe(filas: list, destino: str) -> tuple[str | None, str | None]:
+    """Guarda el informe en JSON o Parquet según la extensión del destino."""
+    try:
+        if destino.lower().endswith((".parquet", ".pq")):
+            pd.DataFrame(filas, columns=CAMPOS).to_parquet(destino, index=False)
+        else:
+            # NaN/inf no son JSON válido: se escriben como null
+            limpias = [{k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in f.items()}
+                       for f in filas]
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(limpias, f, ensure_ascii=False, indent=2, default=float)
+        return destino, None
+    except Exception as e:
+        return None, f"Error al escribir el informe: {e}"
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Regresión lineal simple sobre muchos archivos CSV/Parquet/Arrow.")
+    parser.add_argument("rutas", nargs="+", help="Globs o directorios con los archivos.")
+    parser.add_argument("--x", required=True, help="Columna independiente.")
+    parser.add_argument("--y", required=True, help="Columna dependiente.")
+    parser.add_argument("--salida", default="informe_regresion.json", help="Informe .json o .parquet.")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, núcleos disponibles).")
+    parser.add_argument("--chunksize", type=int, default=TAM_CHUNK, help="Filas por bloque de lectura.")
+    parser.add_argument("--omitir-invalidos", action="store_true",
+                        help="Omitir filas no numéricas en vez de marcar el archivo con error.")
+    args = parser.parse_args(argv)
+
+    archivos = expandir_rutas(args.rutas)
+    if not archivos:
+        print("No se encontraron archivos.", file=sys.stderr)
+        return 2
+
+    inicio = time.perf_counter()
+    filas = []
+    for i, fila in enumerate(ajustar_archivos(archivos, args.x, args.y, args.procesos,
+                                              args.chunksize, args.omitir_invalidos), start=1):
+        filas.append(fila)
+        estado = f"ERROR: {fila['error']}" if fila["error"] else f"n={fila['n']:,} r2={fila['r2']:.4f}"
+        print(f"[{i}/{len(archivos)}] {fila['archivo']}: {estado}", file=sys.stderr)
+
+    destino, error = escribir_informe(filas, args.salida)
+    if error:
+        print(error, file=sys.stderr)
+        return 2
+    fallidos = sum(1 for f in filas if f["error"])
+    print(f"{len(filas) - fallidos} ajustados, {fallidos} con error en {time.perf_counter() - inicio:.1f} s -> {destino}",
+          file=sys.stderr)
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
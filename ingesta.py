@@ -0,0 +1,300 @@
+# ingesta.py - Lectura por bloques de CSV, Parquet y Arrow (solo las columnas necesarias)
+import csv
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+TAM_CHUNK = 1_000_000         # Filas por bloque
+TAM_MUESTRA = 64 * 1024       # Bytes usados para detectar el separador
+SEPARADORES = ",;\t|"
+
+EXT_PARQUET = (".parquet", ".pq")
+EXT_ARROW = (".feather", ".arrow", ".ipc")
+TIPOS_SOPORTADOS = ["csv", "txt", "tsv", "parquet", "pq", "feather", "arrow", "ipc"]
+
+
+def _nombre(fuente) -> str:
+    """Nombre (o ruta) de la fuente, usado para decidir el formato."""
+    if isinstance(fuente, (str, os.PathLike)):
+        return os.fspath(fuente)
+    return getattr(fuente, "name", "") or ""
+
+
+def detectar_formato(fuente) -> str:
+    """Devuelve 'csv', 'parquet' o 'arrow' según la extensión."""
+    nombre = _nombre(fuente).lower()
+    if nombre.endswith(EXT_PARQUET):
+        return "parquet"
+    if nombre.endswith(EXT_ARROW):
+        return "arrow"
+    return "csv"
+
+
+def _rebobinar(fuente):
+    if hasattr(fuente, "seek"):
+        fuente.seek(0)
+
+
+def detectar_separador(fuente) -> str:
+    """Detecta el separador del CSV leyendo una sola muestra del inicio."""
+    if isinstance(fuente, (str, os.PathLike)):
+        with open(fuente, "rb") as f:
+            muestra = f.read(TAM_MUESTRA)
+    else:
+        _rebobinar(fuente)
+        muestra = fuente.read(TAM_MUESTRA)
+        _rebobinar(fuente)
+    if isinstance(muestra, bytes):
+        muestra = muestra.decode("utf-8", errors="ignore")
+    # Descartar la última línea, que puede estar cortada
+    lineas = muestra.splitlines()[:-1] or muestra.splitlines()
+    try:
+        return csv.Sniffer().sniff("\n".join(lineas[:50]), delimiters=SEPARADORES).delimiter
+    except csv.Error:
+        cabecera = lineas[0] if lineas else ""
+        return max(SEPARADORES, key=cabecera.count) if cabecera else ","
+
+
+def _a_float(valores) -> np.ndarray:
+    """Convierte una columna a float64; lo no numérico queda como NaN (validar_datos lo rechaza)."""
+    if isinstance(valores, pd.Series):
+        if valores.dtype == np.float64:
+            return valores.to_numpy()
+        return pd.to_numeric(valores, errors="coerce").to_numpy(dtype=np.float64)
+    return np.asarray(valores, dtype=np.float64)
+
+
+def _arrow_a_float(columna) -> np.ndarray:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    try:
+        columna = pc.cast(columna, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return _a_float(columna.to_pandas())
+    # Nulos -> NaN; sin nulos la conversión no copia
+    return columna.to_numpy(zero_copy_only=False)
+
+
+def _abrir_arrow(fuente):
+    """Abre Parquet/Arrow con memory-map si la fuente es una ruta."""
+    import pyarrow as pa
+    if isinstance(fuente, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(fuente), "r")
+    _rebobinar(fuente)
+    if hasattr(fuente, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(fuente.getbuffer()))
+    return pa.PythonFile(fuente, mode="r")
+
+
+def _abrir_ipc(fuente):
+    import pyarrow as pa
+    lector = _abrir_arrow(fuente)
+    try:
+        return pa.ipc.open_file(lector)
+    except pa.ArrowInvalid:
+        if hasattr(lector, "seek"):
+            lector.seek(0)
+        return pa.ipc.open_stream(lector)
+
+
+def columnas_disponibles(fuente) -> tuple[list | None, str | None]:
+    """Lista las columnas sin leer el archivo completo."""
+    try:
+        formato = detectar_formato(fuente)
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(_abrir_arrow(fuente)).schema_arrow.names, None
+        if formato == "arrow":
+            return _abrir_ipc(fuente).schema.names, None
+        sep = detectar_separador(fuente)
+        columnas = pd.read_csv(fuente, sep=sep, nrows=0).columns.tolist()
+        _rebobinar(fuente)
+        return columnas, None
+    except ImportError:
+        return None, "Se necesita 'pyarrow' para leer archivos Parquet/Arrow."
+    except Exception as e:
+        return None, f"Error al leer columnas: {e}"
+
+
+def _tamano(fuente) -> int | None:
+    if isinstance(fuente, (str, os.PathLike)):
+        return os.path.getsize(fuente)
+    if getattr(fuente, "size", None) is not None:
+        return int(fuente.size)
+    if hasattr(fuente, "getbuffer"):
+        return fuente.getbuffer().nbytes
+    return None
+
+
+def filas_estimadas(fuente) -> int | None:
+    """Filas del archivo para mostrar progreso: exactas en Parquet/Arrow, estimadas en CSV.
+
+    En CSV se extrapola el largo medio de línea de la muestra inicial al
+    tamaño del archivo; None si no se puede estimar.
+    """
+    try:
+        formato = detectar_formato(fuente)
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(_abrir_arrow(fuente)).metadata.num_rows
+        if formato == "arrow":
+            lector = _abrir_ipc(fuente)
+            if not hasattr(lector, "get_batch"):
+                return None
+            return sum(lector.get_batch(i).num_rows for i in range(lector.num_record_batches))
+        tamano = _tamano(fuente)
+        if isinstance(fuente, (str, os.PathLike)):
+            with open(fuente, "rb") as f:
+                muestra = f.read(TAM_MUESTRA)
+        else:
+            _rebobinar(fuente)
+            muestra = fuente.read(TAM_MUESTRA)
+            _rebobinar(fuente)
+        lineas = muestra.count(b"\n" if isinstance(muestra, bytes) else "\n")
+        if not tamano or lineas < 2:
+            return None
+        # La primera línea es la cabecera
+        return max(int(tamano * lineas / len(muestra)) - 1, 0)
+    except Exception:
+        return None
+
+
+def vista_previa(fuente, filas: int = 5) -> tuple[pd.DataFrame | None, str | None]:
+    """Primeras filas del archivo, para mostrar en la interfaz."""
+    try:
+        formato = detectar_formato(fuente)
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            lotes = pq.ParquetFile(_abrir_arrow(fuente)).iter_batches(batch_size=filas)
+            lote = next(lotes, None)
+            return (lote.to_pandas() if lote is not None else pd.DataFrame()), None
+        if formato == "arrow":
+            lector = _abrir_ipc(fuente)
+            lote = lector.get_batch(0) if hasattr(lector, "get_batch") else lector.read_next_batch()
+            return lote.slice(0, filas).to_pandas(), None
+        sep = detectar_separador(fuente)
+        df = pd.read_csv(fuente, sep=sep, nrows=filas)
+        _rebobinar(fuente)
+        return df, None
+    except ImportError:
+        return None, "Se necesita 'pyarrow' para leer archivos Parquet/Arrow."
+    except Exception as e:
+        return None, f"Error al leer el archivo: {e}"
+
+
+def _iterar(fuente, columnas: list, chunksize: int) -> Iterator[tuple]:
+    """Genera tuplas de arrays float64, una por columna pedida, bloque a bloque."""
+    formato = detectar_formato(fuente)
+    unicas = list(dict.fromkeys(columnas))
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(_abrir_arrow(fuente))
+        for lote in archivo.iter_batches(batch_size=chunksize, columns=unicas):
+            yield tuple(_arrow_a_float(lote.column(c)) for c in columnas)
+    elif formato == "arrow":
+        lector = _abrir_ipc(fuente)
+        lotes = (lector.get_batch(i) for i in range(lector.num_record_batches)) if hasattr(lector, "get_batch") else lector
+        for lote in lotes:
+            for inicio in range(0, lote.num_rows, chunksize):
+                parte = lote.slice(inicio, chunksize)
+                yield tuple(_arrow_a_float(parte.column(c)) for c in columnas)
+    else:
+        sep = detectar_separador(fuente)
+        lector = pd.read_csv(fuente, sep=sep, usecols=unicas,
+                             chunksize=chunksize, engine="c", low_memory=True)
+        with lector:
+            for bloque in lector:
+                yield tuple(_a_float(bloque[c]) for c in columnas)
+
+
+def iterar_columnas(fuente, col_x: str, col_y: str, chunksize: int = TAM_CHUNK) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Genera bloques (X, Y) float64 leyendo solo las dos columnas pedidas.
+
+    Para CSV el separador se detecta una sola vez; Parquet y Arrow usan
+    proyección de columnas y memory-map cuando la fuente es una ruta.
+    """
+    return _iterar(fuente, [col_x, col_y], chunksize)
+
+
+def iterar_columna(fuente, columna: str, chunksize: int = TAM_CHUNK) -> Iterator[np.ndarray]:
+    """Genera bloques float64 de una sola columna."""
+    for (valores,) in _iterar(fuente, [columna], chunksize):
+        yield valores
+
+
+def leer_tabla(fuente, columnas: list, chunksize: int = TAM_CHUNK) -> tuple[pd.DataFrame | None, str | None]:
+    """Lee varias columnas numéricas (float64) en un DataFrame, por bloques."""
+    try:
+        columnas = list(dict.fromkeys(columnas))
+        bloques = [np.column_stack(b) for b in _iterar(fuente, columnas, chunksize)]
+        if not bloques:
+            return None, "El archivo no contiene filas."
+        matriz = bloques[0] if len(bloques) == 1 else np.concatenate(bloques)
+        return pd.DataFrame(matriz, columns=columnas, copy=False), None
+    except ImportError:
+        return None, "Se necesita 'pyarrow' para leer archivos Parquet/Arrow."
+    except (KeyError, ValueError) as e:
+        return None, f"Columna no encontrada o inválida: {e}"
+    except Exception as e:
+        return None, f"Error al leer el archivo: {e}"
+
+
+def exportar_bloques(bloques, destino, formato: str = "csv") -> tuple[int | None, str | None]:
+    """Escribe bloques {columna: array} en CSV o Parquet (ruta o archivo binario) sin juntarlos en memoria.
+
+    Devuelve el número de filas escritas.
+    """
+    filas = 0
+    try:
+        if formato == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            escritor = None
+            try:
+                for bloque in bloques:
+                    tabla = pa.table(bloque)
+                    if escritor is None:
+                        escritor = pq.ParquetWriter(destino, tabla.schema)
+                    escritor.write_table(tabla)
+                    filas += tabla.num_rows
+            finally:
+                if escritor is not None:
+                    escritor.close()
+        else:
+            propio = isinstance(destino, (str, os.PathLike))
+            salida = open(destino, "wb") if propio else destino
+            try:
+                for i, bloque in enumerate(bloques):
+                    df = pd.DataFrame(bloque, copy=False)
+                    salida.write(df.to_csv(index=False, header=(i == 0)).encode("utf-8"))
+                    filas += len(df)
+            finally:
+                if propio:
+                    salida.close()
+        return filas, None
+    except ImportError:
+        return None, "Se necesita 'pyarrow' para escribir archivos Parquet."
+    except Exception as e:
+        return None, f"Error al exportar: {e}"
+
+
+def leer_xy(fuente, col_x: str, col_y: str, chunksize: int = TAM_CHUNK) -> tuple[tuple | None, str | None]:
+    """Lee las columnas X e Y completas como arrays float64."""
+    try:
+        bloques_x, bloques_y = [], []
+        for x, y in iterar_columnas(fuente, col_x, col_y, chunksize):
+            bloques_x.append(x)
+            bloques_y.append(y)
+        if not bloques_x:
+            return None, "El archivo no contiene filas."
+        if len(bloques_x) == 1:
+            return (bloques_x[0], bloques_y[0]), None
+        return (np.concatenate(bloques_x), np.concatenate(bloques_y)), None
+    except ImportError:
+        return None, "Se necesita 'pyarrow' para leer archivos Parquet/Arrow."
+    except (KeyError, ValueError) as e:
+        return None, f"Columna no encontrada o inválida: {e}"
+    except Exception as e:
+        return None, f"Error al leer el archivo: {e}"
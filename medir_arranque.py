@@ -0,0 +1,49 @@
+# medir_arranque.py - Mide el tiempo de importación de los módulos de la app
+# Uso: python medir_arranque.py [--presupuesto SEGUNDOS]
+import argparse
+import subprocess
+import sys
+
+MODULOS = ["regresion", "ingesta"]
+PRESUPUESTO_S = 1.0     # Tiempo máximo de importación (intérprete nuevo, sin caché de módulos)
+REPETICIONES = 3
+PROHIBIDOS = ["sklearn", "plotly"]  # No deben cargarse al importar
+
+
+def medir(modulo: str) -> tuple[float, list]:
+    """Importa `modulo` en un proceso nuevo; devuelve (segundos, módulos pesados cargados)."""
+    codigo = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "print(time.perf_counter() - t)\n"
+        f"print(','.join(m for m in {PROHIBIDOS!r} if m in sys.modules))\n"
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    lineas = salida.stdout.splitlines() + [""]
+    return float(lineas[0]), [m for m in lineas[1].split(",") if m]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verifica el presupuesto de tiempo de importación.")
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_S)
+    args = parser.parse_args()
+
+    fallos = 0
+    for modulo in MODULOS:
+        tiempos = []
+        cargados = []
+        for _ in range(REPETICIONES):
+            segundos, cargados = medir(modulo)
+            tiempos.append(segundos)
+        mejor = min(tiempos)
+        estado = "OK" if mejor <= args.presupuesto and not cargados else "FALLA"
+        if estado == "FALLA":
+            fallos += 1
+        extra = f" (cargó {', '.join(cargados)})" if cargados else ""
+        print(f"{estado:5} {modulo:12} {mejor * 1000:8.1f} ms (presupuesto {args.presupuesto * 1000:.0f} ms){extra}")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# perfilado.py - Tiempo, memoria y filas por etapa, con hooks para métricas
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger("regresion.perfilado")
+VAR_LOG = "REGRESION_PERFILADO_LOG"   # Si está definida, cada etapa se escribe como JSON en stderr
+
+if os.environ.get(VAR_LOG) and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_hooks: list = []
+_hooks_lock = threading.Lock()
+# Registros de la ejecución actual (cada sesión de Streamlit corre en su propio hilo/contexto)
+_recolector: contextvars.ContextVar[list | None] = contextvars.ContextVar("recolector", default=None)
+_pila: contextvars.ContextVar[tuple] = contextvars.ContextVar("pila", default=())
+# tracemalloc es global al proceso: quién pidió medir memoria y qué etapas la miden ahora
+_memoria_lock = threading.Lock()
+_interesados: weakref.WeakSet = weakref.WeakSet()
+_en_curso: set = set()
+
+
+def registrar_hook(callback):
+    """Agrega un callback que recibe cada registro (dict) al terminar una etapa."""
+    with _hooks_lock:
+        if callback not in _hooks:
+            _hooks.append(callback)
+
+
+def quitar_hook(callback):
+    with _hooks_lock:
+        if callback in _hooks:
+            _hooks.remove(callback)
+
+
+def hook_log(registro: dict):
+    """Hook que emite cada registro como una línea JSON en el logger 'regresion.perfilado'."""
+    logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+class SolicitudMemoria:
+    """Marca de quien pidió medir memoria (p. ej. una sesión); ver medir_memoria."""
+
+
+def medir_memoria(activar: bool = True, interesado: SolicitudMemoria | None = None):
+    """Activa o desactiva la medición de bytes asignados (tracemalloc, agrega costo).
+
+    Con `interesado` se lleva la cuenta de quién la pidió: la medición sigue
+    activa mientras alguno la pida, así una sesión no la apaga para otra. Los
+    interesados que se liberan (sesiones cerradas) dejan de contar.
+    """
+    with _memoria_lock:
+        if interesado is not None:
+            if activar:
+                _interesados.add(interesado)
+            else:
+                _interesados.discard(interesado)
+            activar = len(_interesados) > 0
+        if activar and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not activar and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def iniciar_recoleccion() -> list:
+    """Empieza a guardar los registros del contexto actual y devuelve la lista."""
+    registros = []
+    _recolector.set(registros)
+    return registros
+
+
+@contextmanager
+def recolectar():
+    """Recolecta en una lista nueva los registros del bloque y restaura la anterior al salir."""
+    registros = []
+    token = _recolector.set(registros)
+    try:
+        yield registros
+    finally:
+        _recolector.reset(token)
+
+
+def _activo() -> bool:
+    return bool(_hooks) or _recolector.get() is not None or logger.isEnabledFor(logging.INFO)
+
+
+class _Etapa:
+    __slots__ = ("filas", "pico_hijos", "hilo", "aproximado")
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.pico_hijos = 0
+        self.hilo = threading.get_ident()
+        self.aproximado = False   # Otro hilo midió memoria a la vez: el pico puede incluir lo suyo
+
+
+@contextmanager
+def etapa(nombre: str, filas: int | None = None):
+    """Mide una etapa. Dentro del bloque se puede fijar `filas` con `.filas = n`.
+
+    Los bytes asignados son el pico de tracemalloc durante la etapa menos la
+    memoria al empezar (None si la medición de memoria está desactivada). El
+    pico es global al proceso: si otro hilo tenía una etapa en curso el
+    registro lleva "memoria_aproximada".
+    """
+    if not _activo():
+        yield _Etapa(filas)
+        return
+    memoria = tracemalloc.is_tracing()
+    padre = _pila.get()
+    if memoria:
+        if padre:
+            # reset_peak borra el pico del padre: se guarda antes de reiniciarlo
+            padre[-1].pico_hijos = max(padre[-1].pico_hijos, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        inicio_memoria = tracemalloc.get_traced_memory()[0]
+    actual = _Etapa(filas)
+    if memoria:
+        with _memoria_lock:
+            for otra in _en_curso:
+                if otra.hilo != actual.hilo:
+                    otra.aproximado = actual.aproximado = True
+            _en_curso.add(actual)
+    token = _pila.set(padre + (actual,))
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield actual
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        _pila.reset(token)
+        if memoria:
+            with _memoria_lock:
+                _en_curso.discard(actual)
+        asignados = None
+        if memoria and tracemalloc.is_tracing():
+            pico = max(tracemalloc.get_traced_memory()[1], actual.pico_hijos)
+            asignados = max(pico - inicio_memoria, 0)
+            if padre:
+                padre[-1].pico_hijos = max(padre[-1].pico_hijos, pico)
+        registro = {
+            "etapa": nombre,
+            "segundos": round(segundos, 6),
+            "bytes_asignados": asignados,
+            "filas": actual.filas,
+            "nivel": len(padre),
+        }
+        if error:
+            registro["error"] = error
+        if asignados is not None and actual.aproximado:
+            registro["memoria_aproximada"] = True
+        _emitir(registro)
+
+
+def _emitir(registro: dict):
+    registros = _recolector.get()
+    if registros is not None:
+        registros.append(registro)
+    if logger.isEnabledFor(logging.INFO):
+        hook_log(registro)
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(registro)
+        except Exception as e:
+            logger.warning(f"Hook de perfilado falló: {e}")
+
+
+def _contar_filas(valor) -> int | None:
+    if isinstance(valor, (str, bytes)) or not hasattr(valor, "__len__"):
+        return None
+    try:
+        return len(valor)
+    except TypeError:
+        return None
+
+
+def perfilar(nombre: str | None = None, filas_del_resultado: bool = False):
+    """Decorador: mide la función como una etapa.
+
+    Las filas salen del primer argumento, o del resultado con
+    `filas_del_resultado` (p. ej. si el argumento es texto).
+    """
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo():
+                return funcion(*args, **kwargs)
+            filas = None if filas_del_resultado or not args else _contar_filas(args[0])
+            with etapa(etiqueta, filas) as actual:
+                resultado = funcion(*args, **kwargs)
+                if filas_del_resultado:
+                    actual.filas = _contar_filas(resultado)
+                return resultado
+        return envoltura
+    return decorador
@@ -1,24 +1,313 @@
 # regresion.py (Simplificado)
-from sklearn.linear_model import LinearRegression
-import plotly.express as px
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Iterable, Iterator
+import io
+import math
+import os
 import pandas as pd
 import numpy as np
 
+from perfilado import perfilar
+
+# plotly y sklearn se importan solo cuando se usan (arranque rápido)
+
 # Nombres de columna
 COL_X = "Variables_independiente"
 COL_Y = "Variables_dependientes"
 COL_PRED = "Predicciones"
+COL_RESIDUO = "Residuos"
+
+# Por encima de este número de puntos el gráfico usa WebGL y una muestra
+MAX_PUNTOS_GRAFICO = 20_000
+
+# Columnas X a partir de las cuales regresion_multiple usa un pool de procesos
+UMBRAL_COLUMNAS_POOL = 256
+
+# Bootstrap (opcional): réplicas al activarlo, grupos de remuestreo y celdas (réplicas x grupos) por lote
+REPLICAS_BOOTSTRAP = 10_000
+GRUPOS_BOOTSTRAP = 2048
+MAX_CELDAS_LOTE = 1 << 22
+PUNTOS_BANDA = 50
+GRADOS_CORNISH_FISHER = 100   # Desde aquí el cuantil t usa la expansión de Cornish–Fisher
+
+# Estimadores robustos
+MAX_PARES_THEIL_SEN = 2_000_000   # Pares usados por Theil–Sen (todos si hay menos)
+ITERACIONES_RANSAC = 200
+ITERACIONES_HUBER = 50
+HUBER_C = 1.345
+TOLERANCIA_HUBER = 1e-8
+
+# Valores por bloque en la predicción masiva
+TAM_CHUNK_PREDICCION = 1_000_000
+
+# Filas por página de la tabla de resultados
+FILAS_POR_PAGINA = 100
+
+# --- Motor de estadísticas suficientes (una sola pasada, fusionable) ---
+
+@dataclass(frozen=True)
+class EstadisticasRegresion:
+    """Estadísticas suficientes de una regresión simple: n, medias, M2 y co-momento.
+
+    Ocupan memoria O(1) y se fusionan con la fórmula de Chan, por lo que un
+    ajuste se puede calcular bloque a bloque sin tener todos los datos en RAM.
+    """
+    n: int = 0
+    media_x: float = 0.0
+    media_y: float = 0.0
+    m2_x: float = 0.0   # Suma de (x - media_x)²
+    m2_y: float = 0.0   # Suma de (y - media_y)²
+    c_xy: float = 0.0   # Suma de (x - media_x)(y - media_y)
+
+    @classmethod
+    def desde_arrays(cls, X, Y) -> "EstadisticasRegresion":
+        """Calcula las estadísticas de un bloque (arrays del mismo largo)."""
+        x = np.asarray(X, dtype=float).ravel()
+        y = np.asarray(Y, dtype=float).ravel()
+        n = x.size
+        if n == 0:
+            return cls()
+        media_x = x.mean()
+        media_y = y.mean()
+        dx = x - media_x
+        dy = y - media_y
+        return cls(n, float(media_x), float(media_y),
+                   float(dx @ dx), float(dy @ dy), float(dx @ dy))
+
+    def combinar(self, otro: "EstadisticasRegresion") -> "EstadisticasRegresion":
+        """Fusiona dos estados (algoritmo paralelo de Chan)."""
+        if otro.n == 0:
+            return self
+        if self.n == 0:
+            return otro
+        n = self.n + otro.n
+        delta_x = otro.media_x - self.media_x
+        delta_y = otro.media_y - self.media_y
+        factor = self.n * otro.n / n
+        return EstadisticasRegresion(
+            n,
+            self.media_x + delta_x * otro.n / n,
+            self.media_y + delta_y * otro.n / n,
+            self.m2_x + otro.m2_x + delta_x * delta_x * factor,
+            self.m2_y + otro.m2_y + delta_y * delta_y * factor,
+            self.c_xy + otro.c_xy + delta_x * delta_y * factor,
+        )
+
+    def quitar(self, otro: "EstadisticasRegresion") -> "EstadisticasRegresion":
+        """Operación inversa de combinar: descuenta un subconjunto ya incluido."""
+        if otro.n == 0:
+            return self
+        n = self.n - otro.n
+        if n < 0:
+            raise ValueError("No se pueden quitar más puntos de los que hay.")
+        if n == 0:
+            return EstadisticasRegresion()
+        media_x = (self.n * self.media_x - otro.n * otro.media_x) / n
+        media_y = (self.n * self.media_y - otro.n * otro.media_y) / n
+        delta_x = otro.media_x - media_x
+        delta_y = otro.media_y - media_y
+        factor = n * otro.n / self.n
+        # Se recorta a 0 el error de redondeo que puede dejar la resta
+        return EstadisticasRegresion(
+            n, media_x, media_y,
+            max(self.m2_x - otro.m2_x - delta_x * delta_x * factor, 0.0),
+            max(self.m2_y - otro.m2_y - delta_y * delta_y * factor, 0.0),
+            self.c_xy - otro.c_xy - delta_x * delta_y * factor,
+        )
+
+    def __add__(self, otro: "EstadisticasRegresion") -> "EstadisticasRegresion":
+        return self.combinar(otro)
+
+    def __sub__(self, otro: "EstadisticasRegresion") -> "EstadisticasRegresion":
+        return self.quitar(otro)
+
+    @property
+    def pendiente(self) -> float:
+        # Con X constante se usa la solución de norma mínima (pendiente 0), como sklearn
+        return self.c_xy / self.m2_x if self.m2_x > 0 else 0.0
+
+    @property
+    def intercepcion(self) -> float:
+        return self.media_y - self.pendiente * self.media_x
+
+    @property
+    def sse(self) -> float:
+        """Suma de cuadrados de los residuos."""
+        return max(self.m2_y - self.pendiente * self.c_xy, 0.0)
+
+    @property
+    def r2(self) -> float:
+        if self.n < 2:
+            return float("nan")   # Con 0 o 1 punto el ajuste no está definido
+        if self.m2_y <= 0:
+            return 1.0 if self.sse == 0 else 0.0
+        return 1.0 - self.sse / self.m2_y
+
+    @property
+    def correlacion(self) -> float:
+        """r de Pearson (NaN si X o Y son constantes)."""
+        if self.m2_x <= 0 or self.m2_y <= 0:
+            return float("nan")
+        return float(np.clip(self.c_xy / np.sqrt(self.m2_x * self.m2_y), -1.0, 1.0))
+
+    @property
+    def error_estandar(self) -> float:
+        """Error estándar de los residuos (n - 2 grados de libertad)."""
+        return float(np.sqrt(self.sse / (self.n - 2))) if self.n > 2 else float("nan")
+
+    @property
+    def se_pendiente(self) -> float:
+        """Error estándar analítico de la pendiente."""
+        return float(self.error_estandar / np.sqrt(self.m2_x)) if self.m2_x > 0 else float("nan")
+
+    @property
+    def se_intercepcion(self) -> float:
+        """Error estándar analítico del intercepto."""
+        if self.m2_x <= 0 or self.n == 0:
+            return float("nan")
+        return self.error_estandar * float(np.sqrt(1.0 / self.n + self.media_x ** 2 / self.m2_x))
+
+    def resumen(self) -> dict:
+        """Todos los resultados del ajuste en un diccionario."""
+        return {
+            "n": self.n,
+            "pendiente": self.pendiente,
+            "intercepcion": self.intercepcion,
+            "r2": self.r2,
+            "correlacion": self.correlacion,
+            "sse": self.sse,
+            "error_estandar": self.error_estandar,
+            "se_pendiente": self.se_pendiente,
+            "se_intercepcion": self.se_intercepcion,
+        }
+
+
+class ModeloLineal:
+    """Modelo ajustado con la interfaz mínima de sklearn (coef_, intercept_, predict)."""
+
+    def __init__(self, pendiente: float, intercepcion: float, estadisticas: EstadisticasRegresion | None = None):
+        self.coef_ = np.array([pendiente])
+        self.intercept_ = intercepcion
+        self.estadisticas = estadisticas
+
+    def predict(self, X) -> np.ndarray:
+        x = np.asarray(X, dtype=float)
+        if x.ndim == 2:
+            x = x[:, 0]
+        return self.coef_[0] * x + self.intercept_
+
+
+class ModeloIncremental:
+    """Ajuste que se actualiza sin recalcular desde cero.
+
+    Guarda solo las estadísticas suficientes: agregar o quitar k puntos cuesta
+    O(k) y combinar dos modelos O(1), así que sirve para mantener un ajuste
+    vivo sobre datos que crecen (un log, un archivo que recibe filas).
+    Expone coef_, intercept_ y predict, por lo que funciona con predecir_valor.
+    """
+
+    def __init__(self, estadisticas: EstadisticasRegresion | None = None):
+        self.estadisticas = estadisticas or EstadisticasRegresion()
+
+    @staticmethod
+    def _bloque(X, Y) -> EstadisticasRegresion:
+        """Estadísticas de un bloque válido; un NaN dejaría el modelo inservible y no se podría quitar."""
+        x, y = _a_array(X), _a_array(Y)
+        if len(x) != len(y):
+            raise ValueError(f"X e Y deben tener la misma longitud ({len(x)} vs {len(y)}).")
+        error = _error_invalidos(x, y)
+        if error:
+            raise ValueError(error)
+        return EstadisticasRegresion.desde_arrays(x, y)
+
+    def agregar(self, X, Y) -> "ModeloIncremental":
+        """Incorpora puntos nuevos (ValueError si hay valores no numéricos o no finitos)."""
+        self.estadisticas = self.estadisticas.combinar(self._bloque(X, Y))
+        return self
+
+    def quitar(self, X, Y) -> "ModeloIncremental":
+        """Elimina puntos que habían sido agregados antes."""
+        self.estadisticas = self.estadisticas.quitar(self._bloque(X, Y))
+        return self
+
+    def combinar(self, otro: "ModeloIncremental") -> "ModeloIncremental":
+        """Fusiona otro modelo (p. ej. ajustado en otro proceso o archivo)."""
+        self.estadisticas = self.estadisticas.combinar(otro.estadisticas)
+        return self
+
+    @property
+    def n(self) -> int:
+        return self.estadisticas.n
+
+    @property
+    def pendiente(self) -> float:
+        return self.estadisticas.pendiente
+
+    @property
+    def intercepcion(self) -> float:
+        return self.estadisticas.intercepcion
+
+    @property
+    def r2(self) -> float:
+        return self.estadisticas.r2
 
+    @property
+    def correlacion(self) -> float:
+        return self.estadisticas.correlacion
+
+    @property
+    def coef_(self) -> np.ndarray:
+        return np.array([self.pendiente])
+
+    @property
+    def intercept_(self) -> float:
+        return self.intercepcion
+
+    def predict(self, X) -> np.ndarray:
+        return ModeloLineal(self.pendiente, self.intercepcion).predict(X)
+
+    def resumen(self) -> dict:
+        return self.estadisticas.resumen()
+
+
+def estadisticas_por_chunks(chunks: Iterable) -> EstadisticasRegresion:
+    """Acumula estadísticas de un iterable de bloques (X, Y) en una sola pasada."""
+    total = EstadisticasRegresion()
+    for X_chunk, Y_chunk in chunks:
+        total = total.combinar(EstadisticasRegresion.desde_arrays(X_chunk, Y_chunk))
+    return total
+
+
+@perfilar()
+def ajuste_streaming(chunks: Iterable) -> tuple[dict | None, str | None]:
+    """Ajusta la regresión sobre bloques (X, Y), p. ej. un generador que lee un archivo grande."""
+    try:
+        est = estadisticas_por_chunks(chunks)
+        if est.n < 2:
+            return None, "Se necesitan al menos 2 puntos."
+        resumen = est.resumen()
+        if not all(np.isfinite([resumen["pendiente"], resumen["intercepcion"], resumen["r2"]])):
+            return None, "Cálculo de regresión resultó en valores no finitos."
+        return resumen, None
+    except ValueError as e:
+        return None, f"Datos inválidos en los bloques: {e}"
+    except Exception as e:
+        return None, f"Error en ajuste por bloques: {e}"
+
+
+@perfilar()
 def correlacion_pearson(X: list, Y: list) -> tuple[float | None, str | None]:
     """Calcula la correlacion de Pearson."""
     try:
-        X_data = np.array(X, dtype=float)
-        Y_data = np.array(Y, dtype=float)
+        X_data = np.asarray(X, dtype=float)
+        Y_data = np.asarray(Y, dtype=float)
 
         if len(X_data) < 2:
             return None, "Se necesitan al menos 2 puntos."
-        # np.corrcoef maneja std=0 devolviendo NaN o con warnings, que podemos chequear después
-        correlacion = np.corrcoef(X_data, Y_data)[0, 1]
+        if len(X_data) != len(Y_data):
+            return None, "X e Y deben tener la misma longitud."
+        correlacion = EstadisticasRegresion.desde_arrays(X_data, Y_data).correlacion
 
         if np.isnan(correlacion):
              return None, "Correlación no definida (posiblemente datos constantes)."
@@ -29,26 +318,84 @@ def correlacion_pearson(X: list, Y: list) -> tuple[float | None, str | None]:
     except Exception as e:
         return None, f"Error en correlación: {e}"
 
-def validar_datos(X: list, Y: list) -> tuple[pd.DataFrame | None, str | None]:
-    """Valida y convierte datos a DataFrame."""
-    if not X or not Y:
+MAX_INDICES_ERROR = 10  # Posiciones inválidas que se listan en el mensaje de error
+
+
+@perfilar(filas_del_resultado=True)
+def parsear_valores(texto: str) -> np.ndarray:
+    """Convierte texto separado por comas (o saltos de línea) en un array float64.
+
+    La conversión es vectorizada; los valores que no son números quedan como
+    NaN en su posición para que validar_datos pueda señalarlos.
+    """
+    if not texto or not texto.strip():
+        return np.empty(0, dtype=float)
+    lineas = texto.replace(",", "\n")
+    try:
+        # Camino rápido: el parser en C de pandas, un valor por línea (las vacías se omiten)
+        return pd.read_csv(io.StringIO(lineas), header=None, dtype=float,
+                           skipinitialspace=True).iloc[:, 0].to_numpy()
+    except (ValueError, pd.errors.ParserError):
+        partes = pd.Series(lineas.split("\n"), dtype=object).str.strip()
+        partes = partes[partes != ""]
+        return pd.to_numeric(partes, errors="coerce").to_numpy(dtype=float)
+
+
+def _a_array(valores) -> np.ndarray:
+    """Array float64 sin copiar si la entrada ya lo es (arrays, buffers, Series)."""
+    if isinstance(valores, pd.Series):
+        valores = valores.to_numpy()
+    try:
+        return np.asarray(valores, dtype=float).ravel()
+    except (ValueError, TypeError):
+        # Hay elementos no convertibles: se marcan como NaN para reportar su posición
+        return pd.to_numeric(pd.Series(list(valores), dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
+def _posiciones_invalidas(nombre: str, datos: np.ndarray) -> str | None:
+    invalidos = np.flatnonzero(~np.isfinite(datos))
+    if invalidos.size == 0:
+        return None
+    listado = ", ".join(str(i) for i in invalidos[:MAX_INDICES_ERROR])
+    resto = invalidos.size - MAX_INDICES_ERROR
+    extra = f" (y {resto} más)" if resto > 0 else ""
+    return f"{nombre}: posiciones {listado}{extra}"
+
+
+def _error_invalidos(X_data: np.ndarray, Y_data: np.ndarray) -> str | None:
+    """Mensaje con las posiciones de valores no numéricos (NaN tras la conversión) o infinitos."""
+    errores = [e for e in (_posiciones_invalidas("X", X_data), _posiciones_invalidas("Y", Y_data)) if e]
+    if errores:
+        return "Se encontraron valores no numéricos o no finitos en " + "; ".join(errores) + "."
+    return None
+
+
+@perfilar()
+def validar_datos(X, Y) -> tuple[pd.DataFrame | None, str | None]:
+    """Valida y convierte datos a DataFrame.
+
+    Acepta listas, arrays de NumPy u objetos con protocolo de buffer; si ya son
+    float64 no se copian. Los valores no numéricos o no finitos se reportan
+    con su índice.
+    """
+    if X is None or Y is None or len(X) == 0 or len(Y) == 0:
         return None, "Las listas X e Y no pueden estar vacías."
     if len(X) != len(Y):
         return None, f"X e Y deben tener la misma longitud ({len(X)} vs {len(Y)})."
 
     try:
-        X_data = np.array(X, dtype=float)
-        Y_data = np.array(Y, dtype=float)
+        X_data = _a_array(X)
+        Y_data = _a_array(Y)
 
-        # Check for NaNs introduced by conversion
-        if np.isnan(X_data).any() or np.isnan(Y_data).any():
-            return None, "Se encontraron valores no numéricos en los datos."
+        error = _error_invalidos(X_data, Y_data)
+        if error:
+            return None, error
 
         if len(X_data) < 2:
              return None, "Se necesitan al menos 2 puntos de datos válidos."
 
         datos = {COL_X: X_data, COL_Y: Y_data}
-        df = pd.DataFrame(datos)
+        df = pd.DataFrame(datos, copy=False)
         return df, None
 
     except ValueError:
@@ -56,33 +403,474 @@ def validar_datos(X: list, Y: list) -> tuple[pd.DataFrame | None, str | None]:
     except Exception as e:
         return None, f"Error inesperado al validar datos: {e}"
 
-def regresion_lineal(df: pd.DataFrame) -> tuple:
-    """Calcula la regresion lineal."""
+def _ajuste_numpy(x_vals: np.ndarray, y_vals: np.ndarray):
+    """Mínimos cuadrados en forma cerrada a partir de las estadísticas suficientes."""
+    est = EstadisticasRegresion.desde_arrays(x_vals, y_vals)
+    return est.pendiente, est.intercepcion, est.r2, ModeloLineal(est.pendiente, est.intercepcion, est)
+
+
+def _ajuste_sklearn(x_vals: np.ndarray, y_vals: np.ndarray):
+    """Backend opcional con sklearn.linear_model.LinearRegression."""
+    from sklearn.linear_model import LinearRegression
+    x_2d = x_vals.reshape(-1, 1)
+    modelo = LinearRegression().fit(x_2d, y_vals)
+    return modelo.coef_[0], modelo.intercept_, modelo.score(x_2d, y_vals), modelo
+
+
+# --- Estimadores robustos (datos con outliers) ---
+
+def _r2_de_recta(x_vals: np.ndarray, y_vals: np.ndarray, pendiente: float, intercepcion: float) -> float:
+    """R² de una recta cualquiera sobre todos los datos (1 - SSE/SST)."""
+    residuos = y_vals - (pendiente * x_vals + intercepcion)
+    sse = float(residuos @ residuos)
+    dy = y_vals - y_vals.mean()
+    sst = float(dy @ dy)
+    if sst <= 0:
+        return 1.0 if sse == 0 else 0.0
+    return 1.0 - sse / sst
+
+
+def _escala_mad(valores: np.ndarray) -> float:
+    """Desviación absoluta mediana escalada (estimador robusto de sigma)."""
+    return 1.4826 * float(np.median(np.abs(valores - np.median(valores))))
+
+
+def _ajuste_theil_sen(x_vals: np.ndarray, y_vals: np.ndarray):
+    """Theil–Sen: mediana de las pendientes entre pares de puntos.
+
+    Con n(n-1)/2 <= MAX_PARES_THEIL_SEN se usan todos los pares, generados
+    fila por fila sobre un único vector de pendientes (tiempo O(n²), memoria
+    O(MAX_PARES_THEIL_SEN)). Por encima se toma la mediana de
+    MAX_PARES_THEIL_SEN pares al azar (semilla fija): tiempo O(n + M), memoria
+    O(M), con un error de cuantil del orden de 1/sqrt(M).
+    El intercepto es la mediana de y - m·x (O(n)).
+    """
+    n = len(x_vals)
+    total_pares = n * (n - 1) // 2
+    if total_pares <= MAX_PARES_THEIL_SEN:
+        pendientes = np.empty(total_pares)
+        usados = 0
+        for i in range(n - 1):
+            dx = x_vals[i + 1:] - x_vals[i]
+            validos = dx != 0
+            k = int(np.count_nonzero(validos))
+            pendientes[usados:usados + k] = (y_vals[i + 1:][validos] - y_vals[i]) / dx[validos]
+            usados += k
+        pendientes = pendientes[:usados]
+    else:
+        rng = np.random.default_rng(0)
+        i = rng.integers(0, n, MAX_PARES_THEIL_SEN)
+        j = rng.integers(0, n, MAX_PARES_THEIL_SEN)
+        dx = x_vals[j] - x_vals[i]
+        validos = dx != 0
+        pendientes = (y_vals[j] - y_vals[i])[validos] / dx[validos]
+    pendiente = float(np.median(pendientes)) if pendientes.size else 0.0
+    intercepcion = float(np.median(y_vals - pendiente * x_vals))
+    return pendiente, intercepcion, _r2_de_recta(x_vals, y_vals, pendiente, intercepcion), ModeloLineal(pendiente, intercepcion)
+
+
+def _ajuste_ransac(x_vals: np.ndarray, y_vals: np.ndarray):
+    """RANSAC: rectas por pares al azar; gana la que tiene más inliers.
+
+    Como máximo ITERACIONES_RANSAC candidatas, evaluadas en bloques de forma
+    vectorizada (matriz candidatas x puntos de como mucho MAX_CELDAS_LOTE
+    celdas). Tiempo O(iteraciones · n), memoria O(MAX_CELDAS_LOTE). El umbral
+    de inlier es la MAD de Y sin escalar (el valor por defecto de sklearn) y el
+    resultado final es mínimos cuadrados sobre los inliers de la mejor candidata.
+    """
+    n = len(x_vals)
+    rng = np.random.default_rng(0)
+    umbral = float(np.median(np.abs(y_vals - np.median(y_vals)))) or float(np.std(y_vals)) or 1.0
+    pares = rng.integers(0, n, size=(ITERACIONES_RANSAC, 2))
+    pares = pares[x_vals[pares[:, 0]] != x_vals[pares[:, 1]]]
+    mejor, mejor_inliers = None, -1
+    tam_lote = max(1, MAX_CELDAS_LOTE // n)
+    for inicio in range(0, len(pares), tam_lote):
+        a, b = pares[inicio:inicio + tam_lote].T
+        m = (y_vals[b] - y_vals[a]) / (x_vals[b] - x_vals[a])
+        c = y_vals[a] - m * x_vals[a]
+        inliers = (np.abs(y_vals[None, :] - (m[:, None] * x_vals[None, :] + c[:, None])) <= umbral).sum(axis=1)
+        k = int(np.argmax(inliers))
+        if inliers[k] > mejor_inliers:
+            mejor, mejor_inliers = (m[k], c[k]), int(inliers[k])
+    if mejor is None:
+        return _ajuste_numpy(x_vals, y_vals)
+    mascara = np.abs(y_vals - (mejor[0] * x_vals + mejor[1])) <= umbral
+    est = EstadisticasRegresion.desde_arrays(x_vals[mascara], y_vals[mascara])
+    if est.n < 2 or est.m2_x <= 0:
+        pendiente, intercepcion = float(mejor[0]), float(mejor[1])
+    else:
+        pendiente, intercepcion = est.pendiente, est.intercepcion
+    return pendiente, intercepcion, _r2_de_recta(x_vals, y_vals, pendiente, intercepcion), ModeloLineal(pendiente, intercepcion)
+
+
+def _ajuste_huber(x_vals: np.ndarray, y_vals: np.ndarray):
+    """Regresión de Huber por mínimos cuadrados reponderados (IRLS).
+
+    Cada iteración es un ajuste ponderado en forma cerrada, O(n) en tiempo y
+    memoria; se detiene al converger o tras ITERACIONES_HUBER iteraciones.
+    Los residuos mayores que 1.345 veces la escala MAD pesan menos.
+    """
+    est = EstadisticasRegresion.desde_arrays(x_vals, y_vals)
+    pendiente, intercepcion = est.pendiente, est.intercepcion
+    for _ in range(ITERACIONES_HUBER):
+        residuos = y_vals - (pendiente * x_vals + intercepcion)
+        escala = _escala_mad(residuos)
+        if escala <= 0:
+            break
+        absolutos = np.abs(residuos) / escala
+        pesos = np.where(absolutos <= HUBER_C, 1.0, HUBER_C / np.maximum(absolutos, 1e-12))
+        suma = pesos.sum()
+        media_x = (pesos @ x_vals) / suma
+        media_y = (pesos @ y_vals) / suma
+        dx = x_vals - media_x
+        m2x = pesos @ (dx * dx)
+        if m2x <= 0:
+            break
+        nueva_pendiente = (pesos @ (dx * (y_vals - media_y))) / m2x
+        nueva_intercepcion = media_y - nueva_pendiente * media_x
+        cambio = abs(nueva_pendiente - pendiente) + abs(nueva_intercepcion - intercepcion)
+        pendiente, intercepcion = float(nueva_pendiente), float(nueva_intercepcion)
+        if cambio <= TOLERANCIA_HUBER * (1.0 + abs(pendiente) + abs(intercepcion)):
+            break
+    return pendiente, intercepcion, _r2_de_recta(x_vals, y_vals, pendiente, intercepcion), ModeloLineal(pendiente, intercepcion)
+
+
+# Backends de ajuste: reciben (x, y) y devuelven (pendiente, intercepcion, r2, modelo)
+BACKENDS = {
+    "numpy": _ajuste_numpy,
+    "sklearn": _ajuste_sklearn,
+    "theil_sen": _ajuste_theil_sen,
+    "ransac": _ajuste_ransac,
+    "huber": _ajuste_huber,
+}
+BACKEND_POR_DEFECTO = "numpy"
+# Backends robustos: no son mínimos cuadrados, así que las fórmulas de intervalos_confianza no aplican
+BACKENDS_ROBUSTOS = ("theil_sen", "ransac", "huber")
+
+
+@perfilar()
+def regresion_lineal(df: pd.DataFrame, backend: str = BACKEND_POR_DEFECTO) -> tuple:
+    """Calcula la regresion lineal con el backend indicado (ver BACKENDS)."""
     if df is None or df.empty:
          return None, None, None, None, None, "DataFrame inválido."
     if len(df) < 2:
         return None, None, None, None, None, "Se necesitan al menos 2 puntos."
+    if backend not in BACKENDS:
+        return None, None, None, None, None, f"Backend desconocido: '{backend}'. Opciones: {', '.join(BACKENDS)}."
 
     try:
-        x_vals = df[[COL_X]].values
-        y_vals = df[COL_Y].values
-
-        modelo = LinearRegression()
-        modelo.fit(x_vals, y_vals)
+        x_vals = df[COL_X].to_numpy(dtype=float)
+        y_vals = df[COL_Y].to_numpy(dtype=float)
 
-        y_pred = modelo.predict(x_vals)
-        r2 = modelo.score(x_vals, y_vals)
-        intercepcion = modelo.intercept_
-        pendiente = modelo.coef_[0]
+        pendiente, intercepcion, r2, modelo = BACKENDS[backend](x_vals, y_vals)
+        y_pred = pendiente * x_vals + intercepcion
 
-        # Chequeo básico de NaN post-cálculo (sklearn es robusto, pero por si acaso)
+        # Chequeo básico de NaN post-cálculo
         if not all(np.isfinite([pendiente, intercepcion, r2])):
              return None, None, None, None, None, "Cálculo de regresión resultó en valores no finitos."
 
         return y_pred, pendiente, r2, intercepcion, modelo, None
+    except ImportError:
+        return None, None, None, None, None, f"El backend '{backend}' requiere una dependencia no instalada."
     except Exception as e:
         return None, None, None, None, None, f"Error en cálculo de regresión: {e}"
 
+def regresion_desde_estadisticas(est: EstadisticasRegresion, x_vals=None) -> tuple:
+    """Resultado de regresion_lineal con mínimos cuadrados a partir de estadísticas ya acumuladas.
+
+    Sirve cuando los datos ya se recorrieron por bloques: no hace otra pasada
+    (solo las predicciones, si se pasa `x_vals`).
+    """
+    if est.n < 2:
+        return None, None, None, None, None, "Se necesitan al menos 2 puntos."
+    pendiente, intercepcion, r2 = est.pendiente, est.intercepcion, est.r2
+    if not all(np.isfinite([pendiente, intercepcion, r2])):
+        return None, None, None, None, None, "Cálculo de regresión resultó en valores no finitos."
+    y_pred = pendiente * np.asarray(x_vals, dtype=float) + intercepcion if x_vals is not None else None
+    return y_pred, pendiente, r2, intercepcion, ModeloLineal(pendiente, intercepcion, est), None
+
+def _momentos_pares(Z: np.ndarray, M: np.ndarray, filas: np.ndarray) -> tuple:
+    """Sumas por pares para las columnas `filas` (como X) contra todas (como Y).
+
+    Z son los datos centrados con NaN en 0 y M la máscara de valores válidos;
+    cada resultado es una matriz (len(filas), k) obtenida con productos matriciales.
+    """
+    Zf, Mf = Z[:, filas], M[:, filas]
+    n = Mf.T @ M                 # Filas válidas en ambas columnas
+    sx = Zf.T @ M                # Suma de X sobre esas filas
+    sy = Mf.T @ Z                # Suma de Y sobre esas filas
+    sxx = (Zf * Zf).T @ M
+    syy = Mf.T @ (Z * Z)
+    sxy = Zf.T @ Z
+    return n, sx, sy, sxx, syy, sxy
+
+
+def nucleos_disponibles() -> int:
+    """Núcleos que puede usar este proceso (respeta la afinidad de CPU si existe)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _momentos_compartidos(nombres: tuple, forma: tuple, filas: np.ndarray) -> tuple:
+    """_momentos_pares en un worker, leyendo Z y M de memoria compartida (sin copias por proceso)."""
+    from multiprocessing import shared_memory
+    bloques = [shared_memory.SharedMemory(name=nombre) for nombre in nombres]
+    try:
+        Z, M = (np.ndarray(forma, dtype=np.float64, buffer=b.buf) for b in bloques)
+        partes = _momentos_pares(Z, M, filas)
+        del Z, M   # Las vistas deben soltarse antes de cerrar el bloque
+        return partes
+    finally:
+        for b in bloques:
+            b.close()
+
+
+def _momentos_en_pool(Z: np.ndarray, M: np.ndarray, grupos: list, workers: int) -> list:
+    """Reparte los grupos de columnas X en un pool; Z y M se comparten, no se serializan."""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    bloques = []
+    try:
+        for origen in (Z, M):
+            bloque = shared_memory.SharedMemory(create=True, size=max(origen.nbytes, 1))
+            bloques.append(bloque)
+            np.ndarray(origen.shape, dtype=np.float64, buffer=bloque.buf)[:] = origen
+        nombres = tuple(b.name for b in bloques)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_momentos_compartidos, [nombres] * len(grupos), [Z.shape] * len(grupos),
+                                 [np.array(g) for g in grupos]))
+    finally:
+        for b in bloques:
+            b.close()
+            b.unlink()
+
+
+@perfilar()
+def regresion_multiple(datos: pd.DataFrame, col_x: str | None = None, columnas: list | None = None,
+                       procesos: int | None = None) -> tuple[pd.DataFrame | None, str | None]:
+    """Ajusta muchas regresiones simples a la vez sobre un bloque de columnas.
+
+    Con `col_x` se regresa cada columna de `columnas` sobre X; sin él se
+    calculan todos los pares ordenados (matriz completa). Cada par usa las
+    filas donde ambas columnas son finitas. Todo sale de unos pocos productos
+    matriciales; con más de UMBRAL_COLUMNAS_POOL columnas X y más de un
+    núcleo (o `procesos` > 1) el trabajo se reparte por grupos de columnas en
+    un pool de procesos que lee los datos de memoria compartida.
+    """
+    if datos is None or datos.empty:
+        return None, "DataFrame inválido."
+    columnas = list(columnas) if columnas else [c for c in datos.columns if c != col_x]
+    if col_x is not None and col_x not in datos.columns:
+        return None, f"Columna X '{col_x}' no encontrada."
+    todas = list(dict.fromkeys(([col_x] if col_x is not None else []) + columnas))
+    if len(todas) < 2:
+        return None, "Se necesitan al menos 2 columnas."
+
+    try:
+        matriz = datos[todas].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        M = np.isfinite(matriz)
+        # Centrar cada columna con su media mejora la estabilidad de las sumas
+        centro = np.where(M, matriz, 0.0).sum(axis=0) / np.maximum(M.sum(axis=0), 1)
+        Z = np.where(M, matriz - centro, 0.0)
+        M = M.astype(float)
+
+        indices_x = [0] if col_x is not None else list(range(len(todas)))
+        workers = min(procesos if procesos is not None else nucleos_disponibles(), len(indices_x))
+        if len(indices_x) > UMBRAL_COLUMNAS_POOL and workers > 1:
+            grupos = [g.tolist() for g in np.array_split(np.array(indices_x), workers) if len(g)]
+            partes = _momentos_en_pool(Z, M, grupos, workers)
+        else:
+            partes = [_momentos_pares(Z, M, np.array(indices_x))]
+
+        n, sx, sy, sxx, syy, sxy = (np.vstack(p) for p in zip(*partes))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m2x = sxx - sx * sx / n
+            m2y = syy - sy * sy / n
+            cxy = sxy - sx * sy / n
+            pendiente = np.where(m2x > 0, cxy / m2x, 0.0)
+            media_x = sx / n + centro[indices_x][:, None]
+            media_y = sy / n + centro[None, :]
+            intercepcion = media_y - pendiente * media_x
+            sse = np.maximum(m2y - pendiente * cxy, 0.0)
+            r2 = np.where(m2y > 0, 1.0 - sse / m2y, np.where(sse == 0, 1.0, 0.0))
+            correlacion = np.where((m2x > 0) & (m2y > 0), cxy / np.sqrt(m2x * m2y), np.nan)
+
+        # Una fila por par (X, Y) con X != Y; en modo col_x solo X contra las demás
+        A, J = np.meshgrid(np.arange(len(indices_x)), np.arange(len(todas)), indexing="ij")
+        I = np.asarray(indices_x)[A]
+        usar = (I != J) & (J >= (1 if col_x is not None else 0))
+        a, j, i = A[usar], J[usar], I[usar]
+        n_par = n[a, j].astype(int)
+        invalido = n_par < 2
+        nombres = np.array(todas, dtype=object)
+
+        def _valor(matriz):
+            return np.where(invalido, np.nan, matriz[a, j])
+
+        filas = {
+            "x": nombres[i], "y": nombres[j], "n": n_par,
+            "pendiente": _valor(pendiente), "intercepcion": _valor(intercepcion),
+            "r2": _valor(r2), "correlacion": np.clip(_valor(correlacion), -1.0, 1.0),
+        }
+        return pd.DataFrame(filas), None
+    except Exception as e:
+        return None, f"Error en regresión múltiple: {e}"
+
+def _prob_abs_t(t: float, grados: int) -> float:
+    """P(|T| < t) de la t de Student con grados enteros (Abramowitz y Stegun 26.7.3-4)."""
+    theta = math.atan(t / math.sqrt(grados))
+    c2 = math.cos(theta) ** 2
+    if grados % 2:
+        if grados == 1:
+            return 2 * theta / math.pi
+        termino = suma = math.cos(theta)
+        for k in range(3, grados - 1, 2):
+            termino *= c2 * (k - 1) / k
+            suma += termino
+        return 2 / math.pi * (theta + math.sin(theta) * suma)
+    termino = suma = 1.0
+    for k in range(2, grados - 1, 2):
+        termino *= c2 * (k - 1) / k
+        suma += termino
+    return math.sin(theta) * suma
+
+
+def _cuantil_t(p: float, grados: int) -> float:
+    """Cuantil de la t de Student sin scipy (importar scipy.stats cuesta más de un segundo).
+
+    Con pocos grados se invierte la distribución exacta por bisección; con
+    GRADOS_CORNISH_FISHER o más se usa la expansión de Cornish–Fisher. El error
+    relativo frente a scipy es menor que 1e-8.
+    """
+    if p == 0.5:
+        return 0.0
+    if p < 0.5:
+        return -_cuantil_t(1.0 - p, grados)
+    if grados >= GRADOS_CORNISH_FISHER:
+        z = NormalDist().inv_cdf(p)
+        z2 = z * z
+        g1 = (z2 + 1) * z / 4
+        g2 = ((5 * z2 + 16) * z2 + 3) * z / 96
+        g3 = (((3 * z2 + 19) * z2 + 17) * z2 - 15) * z / 384
+        g4 = ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) * z / 92160
+        return z + g1 / grados + g2 / grados ** 2 + g3 / grados ** 3 + g4 / grados ** 4
+    objetivo = 2.0 * p - 1.0
+    bajo, alto = 0.0, 1.0
+    while _prob_abs_t(alto, grados) < objetivo:
+        alto *= 2.0
+    while alto - bajo > 1e-12 * alto:
+        medio = 0.5 * (bajo + alto)
+        if _prob_abs_t(medio, grados) < objetivo:
+            bajo = medio
+        else:
+            alto = medio
+    return 0.5 * (bajo + alto)
+
+
+def _replicas_bootstrap(x: np.ndarray, y: np.ndarray, replicas: int, semilla: int, grupos: int) -> np.ndarray:
+    """Pendiente, intercepto, R² y r de cada réplica bootstrap (matriz replicas x 4).
+
+    Cada réplica es un vector de pesos multinomiales sobre G grupos y sus
+    estadísticas salen de un producto matricial pesos @ momentos_por_grupo.
+    Con n <= G cada fila es su propio grupo (bootstrap exacto); con n mayor
+    las filas se asignan al azar a G grupos y se remuestrean los grupos, así
+    el costo por réplica es O(G) y no O(n).
+    """
+    n = len(x)
+    rng = np.random.default_rng(semilla)
+    media_x, media_y = x.mean(), y.mean()
+    dx, dy = x - media_x, y - media_y
+    if n <= grupos:
+        momentos = np.column_stack([np.ones(n), dx, dy, dx * dx, dy * dy, dx * dy])
+    else:
+        grupo = rng.integers(0, grupos, size=n)
+        momentos = np.column_stack([np.bincount(grupo, weights=w, minlength=grupos)
+                                    for w in (None, dx, dy, dx * dx, dy * dy, dx * dy)])
+    g = len(momentos)
+    prob = np.full(g, 1.0 / g)
+    tam_lote = max(1, MAX_CELDAS_LOTE // g)
+    salida = np.empty((replicas, 4))
+    for inicio in range(0, replicas, tam_lote):
+        b = min(tam_lote, replicas - inicio)
+        pesos = rng.multinomial(g, prob, size=b).astype(float)
+        cnt, sx, sy, sxx, syy, sxy = (pesos @ momentos).T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m2x = sxx - sx * sx / cnt
+            m2y = syy - sy * sy / cnt
+            cxy = sxy - sx * sy / cnt
+            pendiente = np.where(m2x > 0, cxy / m2x, 0.0)
+            intercepcion = (sy / cnt + media_y) - pendiente * (sx / cnt + media_x)
+            sse = np.maximum(m2y - pendiente * cxy, 0.0)
+            r2 = np.where(m2y > 0, 1.0 - sse / m2y, 1.0)
+            r = np.where((m2x > 0) & (m2y > 0), cxy / np.sqrt(m2x * m2y), np.nan)
+        salida[inicio:inicio + b] = np.column_stack([pendiente, intercepcion, r2, r])
+    return salida
+
+
+@perfilar()
+def intervalos_confianza(df: pd.DataFrame, nivel: float = 0.95, replicas: int = 0,
+                         semilla: int = 0, grupos: int = GRUPOS_BOOTSTRAP,
+                         estadisticas: EstadisticasRegresion | None = None) -> tuple[dict | None, str | None]:
+    """Errores estándar, intervalos t y, si se pide, bootstrap del ajuste.
+
+    Los errores estándar y los intervalos t salen de las estadísticas
+    suficientes y cuestan O(1). El bootstrap de percentiles es opcional
+    (`replicas` > 0, p. ej. REPLICAS_BOOTSTRAP): es vectorizado (ver
+    _replicas_bootstrap) y reproducible con `semilla`, pero tarda del orden de
+    un segundo con 10.000 réplicas.
+    El resultado incluye una banda de confianza para la recta lista para
+    graficar_regresion. Si ya se tienen las `estadisticas` de df no se recalculan.
+    """
+    if df is None or df.empty:
+        return None, "DataFrame inválido."
+    if len(df) < 3:
+        return None, "Se necesitan al menos 3 puntos para estimar la incertidumbre."
+    if not 0 < nivel < 1:
+        return None, "El nivel de confianza debe estar entre 0 y 1."
+    try:
+        x = df[COL_X].to_numpy(dtype=float)
+        y = df[COL_Y].to_numpy(dtype=float)
+        est = estadisticas if estadisticas is not None else EstadisticasRegresion.desde_arrays(x, y)
+        if est.m2_x <= 0:
+            return None, "X es constante: la pendiente no tiene incertidumbre definida."
+
+        alfa = 1.0 - nivel
+        t = _cuantil_t(1.0 - alfa / 2, est.n - 2)
+        resultado = {
+            "nivel": nivel,
+            "se_pendiente": est.se_pendiente,
+            "se_intercepcion": est.se_intercepcion,
+            "ic_t_pendiente": (est.pendiente - t * est.se_pendiente, est.pendiente + t * est.se_pendiente),
+            "ic_t_intercepcion": (est.intercepcion - t * est.se_intercepcion, est.intercepcion + t * est.se_intercepcion),
+            "replicas": replicas,
+        }
+
+        x_banda = np.linspace(x.min(), x.max(), PUNTOS_BANDA)
+        if replicas > 0:
+            boot = _replicas_bootstrap(x, y, replicas, semilla, grupos)
+            percentiles = [100 * alfa / 2, 100 * (1 - alfa / 2)]
+            for col, nombre in enumerate(["pendiente", "intercepcion", "r2", "correlacion"]):
+                bajo, alto = np.nanpercentile(boot[:, col], percentiles)
+                resultado[f"ic_boot_{nombre}"] = (float(bajo), float(alto))
+            resultado["se_boot_pendiente"] = float(np.std(boot[:, 0], ddof=1))
+            resultado["se_boot_intercepcion"] = float(np.std(boot[:, 1], ddof=1))
+            # Banda bootstrap: percentiles de la recta de cada réplica sobre la rejilla
+            lineas = boot[:, 1:2] + boot[:, 0:1] * x_banda
+            banda_baja, banda_alta = np.percentile(lineas, percentiles, axis=0)
+        else:
+            # Banda analítica para la media de Y
+            margen = t * est.error_estandar * np.sqrt(1.0 / est.n + (x_banda - est.media_x) ** 2 / est.m2_x)
+            centro = est.intercepcion + est.pendiente * x_banda
+            banda_baja, banda_alta = centro - margen, centro + margen
+        resultado["banda"] = {"x": x_banda, "bajo": banda_baja, "alto": banda_alta}
+        return resultado, None
+    except Exception as e:
+        return None, f"Error al calcular intervalos: {e}"
+
+
+@perfilar()
 def predecir_valor(modelo, nuevo_x) -> tuple[float | None, str | None]:
     """Realiza una predicción."""
     if modelo is None:
@@ -101,21 +889,205 @@ def predecir_valor(modelo, nuevo_x) -> tuple[float | None, str | None]:
     except Exception as e:
         return None, f"Error al predecir: {e}"
 
-def graficar_regresion(df: pd.DataFrame, predicciones, r2: float):
-    """Genera la figura de Plotly."""
+def predecir_lote(modelo, datos, columna: str | None = None,
+                  chunksize: int = TAM_CHUNK_PREDICCION) -> tuple[Iterator | None, str | None]:
+    """Predicción vectorizada sobre muchos valores de X.
+
+    `datos` puede ser un array/lista, un iterable de bloques o un archivo
+    (ruta o archivo subido) del que se lee `columna`; el archivo y la columna
+    se comprueban antes de empezar. Devuelve un generador de tuplas
+    (x, prediccion, valido): los valores no numéricos o no finitos se marcan
+    en la máscara `valido` y su predicción es NaN, sin lanzar excepciones.
+    """
+    if modelo is None:
+        return None, "Modelo no disponible."
+    try:
+        pendiente = float(np.ravel(modelo.coef_)[0])
+        intercepcion = float(modelo.intercept_)
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return None, "Modelo inválido para predecir."
+
+    if columna is not None:
+        from ingesta import columnas_disponibles, iterar_columna
+        disponibles, error = columnas_disponibles(datos)
+        if error:
+            return None, error
+        if columna not in disponibles:
+            return None, f"Columna '{columna}' no encontrada en el archivo."
+        bloques = iterar_columna(datos, columna, chunksize)
+    elif isinstance(datos, (str, bytes, os.PathLike)) or hasattr(datos, "read"):
+        # Un archivo iterado como bloques daría líneas o caracteres, no valores
+        return None, "Para predecir desde un archivo indica la columna de X."
+    elif np.isscalar(datos) or isinstance(datos, (np.ndarray, pd.Series, list, tuple)):
+        valores = _a_array(datos)   # Un escalar se predice como un lote de un valor
+        bloques = (valores[i:i + chunksize] for i in range(0, len(valores), chunksize))
+    else:
+        try:
+            bloques = (_a_array(b) for b in iter(datos))
+        except TypeError:
+            return None, "Los datos a predecir deben ser un valor, una lista, un array o bloques de valores."
+
+    def _generar():
+        for x in bloques:
+            x = _a_array(x)
+            valido = np.isfinite(x)
+            with np.errstate(invalid="ignore", over="ignore"):
+                prediccion = pendiente * x + intercepcion
+            valido &= np.isfinite(prediccion)
+            prediccion[~valido] = np.nan
+            yield x, prediccion, valido
+
+    return _generar(), None
+
+
+# --- Tabla de resultados: orden y filtro sobre arrays, solo se formatea la página visible ---
+
+def columnas_resultados(df: pd.DataFrame, predicciones=None) -> dict:
+    """Arrays de la tabla de resultados (X e Y sin copiar); el residuo es Y - predicción."""
+    columnas = {COL_X: df[COL_X].to_numpy(), COL_Y: df[COL_Y].to_numpy()}
+    if predicciones is not None:
+        prediccion = np.asarray(predicciones, dtype=np.float64)
+        columnas[COL_PRED] = prediccion
+        columnas[COL_RESIDUO] = columnas[COL_Y] - prediccion
+    return columnas
+
+
+def ordenar_filtrar(columnas: dict, orden: str | None = None, descendente: bool = False,
+                    filtro: tuple | None = None) -> tuple[np.ndarray | None, str | None]:
+    """Índices de las filas visibles, en el orden pedido.
+
+    `filtro` es (columna, minimo, maximo); un límite None no se aplica.
+    El orden es estable: los empates conservan el orden original.
+    """
+    try:
+        n = len(next(iter(columnas.values()))) if columnas else 0
+        indices = np.arange(n)
+        if filtro is not None:
+            columna, minimo, maximo = filtro
+            valores = columnas[columna]
+            mascara = np.ones(n, dtype=bool)
+            if minimo is not None:
+                mascara &= valores >= minimo
+            if maximo is not None:
+                mascara &= valores <= maximo
+            indices = np.flatnonzero(mascara)
+        if orden is not None:
+            valores = columnas[orden][indices]
+            indices = indices[np.argsort(-valores if descendente else valores, kind="stable")]
+        return indices, None
+    except KeyError as e:
+        return None, f"Columna desconocida: {e}"
+    except Exception as e:
+        return None, f"Error al ordenar o filtrar: {e}"
+
+
+def pagina_resultados(columnas: dict, indices: np.ndarray, pagina: int,
+                      filas_por_pagina: int = FILAS_POR_PAGINA) -> pd.DataFrame:
+    """Página `pagina` (desde 0) ya formateada; el índice es la fila original."""
+    seleccion = indices[pagina * filas_por_pagina:(pagina + 1) * filas_por_pagina]
+    return pd.DataFrame({nombre: valores[seleccion] for nombre, valores in columnas.items()},
+                        index=seleccion).map('{:.4f}'.format)
+
+
+def bloques_resultados(columnas: dict, indices: np.ndarray | None = None,
+                       tam_bloque: int = TAM_CHUNK_PREDICCION) -> Iterator[dict]:
+    """Bloques {columna: array} para exportar_bloques (todas las filas si `indices` es None)."""
+    n = len(next(iter(columnas.values()))) if indices is None else len(indices)
+    for inicio in range(0, n, tam_bloque):
+        if indices is None:
+            yield {nombre: valores[inicio:inicio + tam_bloque] for nombre, valores in columnas.items()}
+        else:
+            seleccion = indices[inicio:inicio + tam_bloque]
+            yield {nombre: valores[seleccion] for nombre, valores in columnas.items()}
+
+
+def reducir_puntos(x: np.ndarray, y: np.ndarray, max_puntos: int = MAX_PUNTOS_GRAFICO) -> np.ndarray:
+    """Índices de una muestra estratificada de como mucho ~max_puntos puntos.
+
+    Divide el plano en una rejilla y conserva un punto por celda ocupada, de
+    modo que las zonas densas se reducen y los puntos aislados (outliers)
+    siempre sobreviven. También se conservan los extremos de X e Y, y el cupo
+    restante se llena con una muestra aleatoria (semilla fija) que conserva la
+    densidad.
+    """
+    n = len(x)
+    if n <= max_puntos:
+        return np.arange(n)
+    lado = max(int(np.sqrt(max_puntos)), 1)
+
+    def _celda(v):
+        v_min, v_max = v.min(), v.max()
+        if v_max <= v_min:
+            return np.zeros(n, dtype=np.int64)
+        return np.minimum(((v - v_min) * (lado / (v_max - v_min))).astype(np.int64), lado - 1)
+
+    celdas = _celda(x) * lado + _celda(y)
+    _, indices = np.unique(celdas, return_index=True)
+    extremos = [np.argmin(x), np.argmax(x), np.argmin(y), np.argmax(y)]
+    indices = np.union1d(indices, extremos)
+    cupo = max_puntos - len(indices)
+    if cupo > 0:
+        aleatorios = np.random.default_rng(0).choice(n, size=cupo, replace=False)
+        indices = np.union1d(indices, aleatorios)
+    return indices
+
+
+@perfilar()
+def graficar_regresion(df: pd.DataFrame, predicciones, r2: float, max_puntos: int = MAX_PUNTOS_GRAFICO,
+                       banda: dict | None = None):
+    """Genera la figura de Plotly.
+
+    Con más de max_puntos puntos se dibuja una muestra estratificada con WebGL,
+    así el tamaño de la figura queda acotado sin importar el tamaño de los datos.
+    `banda` ({"x", "bajo", "alto"}, p. ej. de intervalos_confianza) agrega la
+    banda de confianza de la recta.
+    """
     if df is None or predicciones is None or r2 is None or not np.isfinite(r2):
         return None # No graficar si faltan datos o r2 es inválido
 
-    df_copy = df.copy()
-    df_copy[COL_PRED] = predicciones
     try:
-        fig = px.scatter(df_copy, x=COL_X, y=COL_Y,
-                         title=f"Regresión Lineal (R² = {r2:.4f})",
-                         labels={COL_X: 'Variable Independiente (X)', COL_Y: 'Variable Dependiente (Y)'})
-        fig.add_scatter(x=df_copy[COL_X], y=df_copy[COL_PRED],
+        import plotly.express as px
+        x_todos = df[COL_X].to_numpy(dtype=float)
+        x_vals = x_todos
+        y_vals = df[COL_Y].to_numpy(dtype=float)
+        predicciones = np.asarray(predicciones, dtype=float)
+        n = len(x_vals)
+        grande = n > max_puntos
+
+        titulo = f"Regresión Lineal (R² = {r2:.4f})"
+        if grande:
+            indices = reducir_puntos(x_vals, y_vals, max_puntos)
+            x_vals, y_vals = x_vals[indices], y_vals[indices]
+            titulo += f" — muestra de {len(indices):,} de {n:,} puntos"
+
+        fig = px.scatter(x=x_vals, y=y_vals, title=titulo,
+                         render_mode="webgl" if grande else "auto",
+                         labels={'x': 'Variable Independiente (X)', 'y': 'Variable Dependiente (Y)'})
+        # La recta solo necesita sus extremos
+        extremos = [int(np.argmin(x_todos)), int(np.argmax(x_todos))]
+        fig.add_scatter(x=x_todos[extremos], y=predicciones[extremos],
                         mode="lines", name="Línea de regresión", line=dict(color='red'))
+        if banda is not None:
+            fig.add_scatter(x=banda["x"], y=banda["alto"], mode="lines", line=dict(width=0),
+                            showlegend=False, hoverinfo="skip")
+            fig.add_scatter(x=banda["x"], y=banda["bajo"], mode="lines", line=dict(width=0),
+                            fill="tonexty", fillcolor="rgba(255, 0, 0, 0.15)", name="Banda de confianza")
         fig.update_layout(showlegend=True)
         return fig
     except Exception as e:
         print(f"Error al graficar: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def figura_con_prediccion(fig, x: float, y: float):
+    """Devuelve una figura nueva = figura base + una capa con el punto predicho.
+
+    La base no se modifica, así la capa se reemplaza en cada ejecución en vez
+    de acumularse. La copia cuesta O(puntos graficados), acotado por
+    MAX_PUNTOS_GRAFICO; sin predicción conviene mostrar la base directamente.
+    """
+    import plotly.graph_objects as go
+    nueva = go.Figure(fig)
+    nueva.add_scatter(x=[x], y=[y], mode="markers", name=f"Predicción ({x:.2f})",
+                      marker=dict(color="purple", size=12, symbol="star"))
+    return nueva
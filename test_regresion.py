@@ -0,0 +1,199 @@
+# test_regresion.py - Equivalencias del motor de estadísticas suficientes
+import numpy as np
+import pandas as pd
+import pytest
+
+from regresion import (
+    BACKENDS_ROBUSTOS, EstadisticasRegresion, ModeloLineal, _ajuste_theil_sen, _cuantil_t, estadisticas_por_chunks, intervalos_confianza, predecir_lote,
+    regresion_lineal, regresion_multiple, validar_datos,
+)
+
+CAMPOS = ["n", "media_x", "media_y", "m2_x", "m2_y", "c_xy"]
+
+
+def datos(n: int = 5_000, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    x = rng.normal(1e3, 50, n)   # Media grande: pone a prueba la estabilidad numérica
+    y = 0.7 * x - 40 + rng.normal(0, 10, n)
+    return x, y
+
+
+def comparar(a: EstadisticasRegresion, b: EstadisticasRegresion, rtol: float = 1e-9):
+    for campo in CAMPOS:
+        assert getattr(a, campo) == pytest.approx(getattr(b, campo), rel=rtol, abs=1e-9), campo
+
+
+def test_combinar_bloques_igual_a_directo():
+    x, y = datos()
+    cortes = [0, 1, 7, 600, 601, 3_000, len(x)]
+    bloques = [(x[i:j], y[i:j]) for i, j in zip(cortes[:-1], cortes[1:])]
+    comparar(estadisticas_por_chunks(bloques), EstadisticasRegresion.desde_arrays(x, y))
+
+
+def test_combinar_es_asociativa_y_con_vacio():
+    x, y = datos()
+    a, b, c = (EstadisticasRegresion.desde_arrays(x[s], y[s]) for s in (slice(0, 100), slice(100, 2_000), slice(2_000, None)))
+    comparar((a + b) + c, a + (b + c))
+    comparar(a + EstadisticasRegresion(), a)
+    comparar(EstadisticasRegresion() + a, a)
+
+
+def test_quitar_deshace_combinar():
+    x, y = datos()
+    a = EstadisticasRegresion.desde_arrays(x[:3_000], y[:3_000])
+    b = EstadisticasRegresion.desde_arrays(x[3_000:], y[3_000:])
+    comparar((a + b) - b, a, rtol=1e-7)
+    comparar((a + b) - a, b, rtol=1e-7)
+    assert (a - a).n == 0
+    with pytest.raises(ValueError):
+        a - (a + b)
+
+
+def test_backend_numpy_igual_a_sklearn():
+    pytest.importorskip("sklearn")
+    x, y = datos()
+    df, error = validar_datos(x, y)
+    assert error is None
+    _, m_np, r2_np, b_np, _, error_np = regresion_lineal(df, backend="numpy")
+    _, m_sk, r2_sk, b_sk, _, error_sk = regresion_lineal(df, backend="sklearn")
+    assert error_np is None and error_sk is None
+    assert m_np == pytest.approx(m_sk, rel=1e-10)
+    assert b_np == pytest.approx(b_sk, rel=1e-10)
+    assert r2_np == pytest.approx(r2_sk, rel=1e-10)
+
+
+def tabla_con_nan(semilla: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    base = rng.normal(0, 1, 400)
+    tabla = pd.DataFrame({f"c{k}": base * k + rng.normal(0, 1 + k, 400) for k in range(5)})
+    # ~10% de celdas vacías al azar y una columna con un tercio vacío: cada par usa filas distintas
+    tabla = tabla.mask(rng.random(tabla.shape) < 0.1)
+    tabla["c4"] = tabla["c4"].where(tabla.index % 3 != 0)
+    return tabla
+
+
+@pytest.mark.parametrize("col_x", [None, "c0"])
+def test_regresion_multiple_igual_a_pares(col_x):
+    tabla = tabla_con_nan()
+    resumen, error = regresion_multiple(tabla, col_x=col_x)
+    assert error is None
+    esperado = 5 * 4 if col_x is None else 4
+    assert len(resumen) == esperado
+    for fila in resumen.itertuples(index=False):
+        par = tabla[[fila.x, fila.y]].dropna()
+        est = EstadisticasRegresion.desde_arrays(par[fila.x], par[fila.y])
+        assert fila.n == est.n
+        assert fila.pendiente == pytest.approx(est.pendiente, rel=1e-9)
+        assert fila.intercepcion == pytest.approx(est.intercepcion, rel=1e-9, abs=1e-12)
+        assert fila.r2 == pytest.approx(est.r2, rel=1e-9)
+        assert fila.correlacion == pytest.approx(est.correlacion, rel=1e-9)
+
+
+def test_regresion_multiple_igual_a_sklearn():
+    sklearn_lineal = pytest.importorskip("sklearn.linear_model")
+    tabla = tabla_con_nan(semilla=2)
+    resumen, error = regresion_multiple(tabla, col_x="c1")
+    assert error is None
+    for fila in resumen.itertuples(index=False):
+        par = tabla[[fila.x, fila.y]].dropna()
+        X = par[[fila.x]].to_numpy()
+        modelo = sklearn_lineal.LinearRegression().fit(X, par[fila.y])
+        assert fila.pendiente == pytest.approx(modelo.coef_[0], rel=1e-9)
+        assert fila.intercepcion == pytest.approx(modelo.intercept_, rel=1e-9)
+        assert fila.r2 == pytest.approx(modelo.score(X, par[fila.y]), rel=1e-9)
+
+
+@pytest.mark.parametrize("X, Y", [(None, None), ([1.0, 2.0], None), ([], []), (np.array([]), np.array([]))])
+def test_validar_datos_vacios(X, Y):
+    assert validar_datos(X, Y) == (None, "Las listas X e Y no pueden estar vacías.")
+
+
+def test_predecir_lote_escalar_y_no_iterable():
+    modelo = ModeloLineal(2.0, 1.0)
+    bloques, error = predecir_lote(modelo, 5)
+    assert error is None
+    (x, prediccion, valido), = list(bloques)
+    assert x.tolist() == [5.0] and prediccion.tolist() == [11.0] and valido.tolist() == [True]
+    bloques, error = predecir_lote(modelo, None)
+    assert bloques is None and error
+
+
+@pytest.mark.parametrize("extension", ["csv", "parquet"])
+def test_cli_columna_faltante(tmp_path, extension):
+    from cli import ajustar_archivo
+    ruta = tmp_path / f"datos.{extension}"
+    tabla = pd.DataFrame({"a": np.arange(10.0), "b": 2 * np.arange(10.0) + 1})
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+        tabla.to_parquet(ruta)
+    else:
+        tabla.to_csv(ruta, index=False)
+    assert ajustar_archivo(str(ruta), "a", "t")["error"] == "Columna 't' no encontrada en el archivo."
+    fila = ajustar_archivo(str(ruta), "a", "b")
+    assert fila["error"] is None and fila["pendiente"] == pytest.approx(2.0)
+
+
+# Cuantiles de la t de Student de referencia (tablas / scipy.stats.t.ppf)
+CUANTILES_T = [
+    (1, 0.975, 12.706204736174694), (1, 0.995, 63.656741162871526),
+    (2, 0.975, 4.302652729749462), (2, 0.995, 9.924843200918287),
+    (10, 0.975, 2.228138851986274), (10, 0.995, 3.16927267261695),
+    (99, 0.975, 1.9842169515864174), (99, 0.995, 2.626405457280827),
+    (100, 0.975, 1.9839715185235518), (100, 0.995, 2.6258905214380173),
+    (10**6, 0.975, 1.959966356814107), (10**6, 0.995, 2.5758342201053344),
+]
+
+
+@pytest.mark.parametrize("grados, p, esperado", CUANTILES_T)
+def test_cuantil_t_tabla(grados, p, esperado):
+    assert _cuantil_t(p, grados) == pytest.approx(esperado, rel=1e-8)
+    assert _cuantil_t(1 - p, grados) == pytest.approx(-esperado, rel=1e-8)
+
+
+def test_intervalos_bootstrap_contienen_la_pendiente():
+    x, y = datos(n=2_000, semilla=3)
+    df, _ = validar_datos(x, y)
+    est = EstadisticasRegresion.desde_arrays(x, y)
+    resultado, error = intervalos_confianza(df, replicas=2_000, semilla=7)
+    assert error is None
+    for clave in ("ic_t_pendiente", "ic_boot_pendiente"):
+        bajo, alto = resultado[clave]
+        assert bajo < est.pendiente < alto, clave
+    # El bootstrap debe parecerse al intervalo t y ser reproducible con la semilla
+    assert resultado["se_boot_pendiente"] == pytest.approx(resultado["se_pendiente"], rel=0.15)
+    repetido, _ = intervalos_confianza(df, replicas=2_000, semilla=7)
+    assert repetido["ic_boot_pendiente"] == resultado["ic_boot_pendiente"]
+
+
+def datos_con_outliers(n: int, semilla: int = 4):
+    """Recta y = 3x + 5 con un 10% de outliers muy por debajo en el extremo derecho."""
+    rng = np.random.default_rng(semilla)
+    x = rng.uniform(0, 10, n)
+    y = 3 * x + 5 + rng.normal(0, 1, n)
+    outliers = rng.choice(n, n // 10, replace=False)
+    x[outliers] = rng.uniform(8, 10, outliers.size)
+    y[outliers] = -40 + rng.normal(0, 5, outliers.size)
+    return x, y
+
+
+@pytest.mark.parametrize("n", [500, 3_000])   # Theil–Sen exacto y con pares al azar
+@pytest.mark.parametrize("backend", BACKENDS_ROBUSTOS)
+def test_backends_robustos_ignoran_outliers(backend, n):
+    df, _ = validar_datos(*datos_con_outliers(n))
+    _, m_ols, _, _, _, _ = regresion_lineal(df, backend="numpy")
+    _, pendiente, _, intercepcion, _, error = regresion_lineal(df, backend=backend)
+    assert error is None
+    assert abs(m_ols - 3) > 1
+    assert pendiente == pytest.approx(3, abs=0.15)
+    assert intercepcion == pytest.approx(5, abs=0.75)
+
+
+def test_theil_sen_exacto_es_mediana_de_todos_los_pares():
+    x, y = datos_con_outliers(300, semilla=5)
+    x[:20] = x[20:40]   # X repetidas: los pares con dx = 0 se descartan
+    i, j = np.triu_indices(len(x), k=1)
+    dx = x[j] - x[i]
+    esperado = np.median((y[j] - y[i])[dx != 0] / dx[dx != 0])
+    pendiente, intercepcion, _, _ = _ajuste_theil_sen(x, y)
+    assert pendiente == esperado
+    assert intercepcion == pytest.approx(np.median(y - esperado * x))
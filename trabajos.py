@@ -0,0 +1,259 @@
+# trabajos.py - Cálculo en segundo plano, cancelable y con progreso
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache_resultados import clave_datos
+from ingesta import filas_estimadas, iterar_columnas
+from perfilado import etapa, recolectar
+from regresion import (
+    BACKENDS_ROBUSTOS, COL_X, COL_Y, MAX_PUNTOS_GRAFICO, REPLICAS_BOOTSTRAP,
+    EstadisticasRegresion, graficar_regresion, intervalos_confianza,
+    regresion_desde_estadisticas, regresion_lineal, validar_datos,
+)
+
+MAX_TRABAJOS_SERVIDOR = 2        # Trabajos ejecutándose a la vez en todo el servidor
+UMBRAL_SEGUNDO_PLANO = 200_000   # Con menos puntos el cálculo es inmediato y no se encola
+UMBRAL_BYTES_SEGUNDO_PLANO = 4 * 1024 * 1024   # Lo mismo para archivos, por tamaño (aún no se leyeron)
+TAM_BLOQUE = 1_000_000           # Puntos por bloque en la etapa incremental
+
+# Versión del contenido de 'resultado' en la caché (la figura es un go.Figure); forma
+# parte de la clave para que las entradas en disco de otro formato no se lean
+FORMATO_RESULTADO = 2
+
+# Estados de un trabajo
+EN_COLA, EJECUTANDO, TERMINADO, CANCELADO, FALLIDO = "en_cola", "ejecutando", "terminado", "cancelado", "fallido"
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza en los puntos de control cuando se pidió cancelar."""
+
+
+class Trabajo:
+    """Estado compartido entre el hilo que calcula y la interfaz que lo consulta."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, descripcion: str = ""):
+        self.id = next(self._ids)
+        self.descripcion = descripcion
+        self.estado = EN_COLA
+        self.progreso = 0.0
+        self.mensaje = "En cola"
+        self.provisional: dict | None = None   # Ajuste parcial con los bloques procesados
+        self.resultado = None
+        self.error: str | None = None
+        self.registros: list = []
+        self.creado = time.time()
+        self._cancelar = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelar.is_set()
+
+    @property
+    def activo(self) -> bool:
+        return self.estado in (EN_COLA, EJECUTANDO)
+
+    def avanzar(self, progreso: float, mensaje: str, provisional: dict | None = None):
+        """Actualiza el progreso; también es un punto de control de cancelación."""
+        if self.cancelado:
+            raise TrabajoCancelado()
+        with self._lock:
+            self.progreso = min(max(progreso, 0.0), 1.0)
+            self.mensaje = mensaje
+            if provisional is not None:
+                self.provisional = provisional
+
+    def estado_actual(self) -> dict:
+        with self._lock:
+            return {"estado": self.estado, "progreso": self.progreso, "mensaje": self.mensaje,
+                    "provisional": self.provisional, "error": self.error}
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """Corre `funcion(self, *args, **kwargs)` y registra el resultado o el error."""
+        if self.cancelado:
+            self.estado = CANCELADO
+            return
+        self.estado = EJECUTANDO
+        self.mensaje = "Calculando"
+        try:
+            self.resultado = funcion(self, *args, **kwargs)
+            self.progreso = 1.0
+            self.estado = TERMINADO
+            self.mensaje = "Listo"
+        except TrabajoCancelado:
+            self.estado = CANCELADO
+            self.mensaje = "Cancelado"
+        except Exception as e:
+            self.error = f"Error en el cálculo: {e}"
+            self.estado = FALLIDO
+            self.mensaje = self.error
+
+
+class GestorTrabajos:
+    """Pool de hilos con un límite global de trabajos simultáneos.
+
+    Los trabajos que superan el límite esperan en cola, así un cálculo pesado
+    ocupa como mucho un hilo y no bloquea a los demás usuarios.
+    """
+
+    def __init__(self, max_concurrentes: int = MAX_TRABAJOS_SERVIDOR):
+        self.max_concurrentes = max_concurrentes
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrentes, thread_name_prefix="regresion")
+
+    def enviar(self, funcion, *args, descripcion: str = "", **kwargs) -> Trabajo:
+        trabajo = Trabajo(descripcion)
+        self._pool.submit(trabajo.ejecutar, funcion, *args, **kwargs)
+        return trabajo
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _salida(**valores) -> dict:
+    return {"df": None, "predicciones": None, "resultado": None, "avisos": [], "error_validacion": None, **valores}
+
+
+def _avanzar_con(trabajo: Trabajo, progreso: float, mensaje: str, est: EstadisticasRegresion):
+    """Progreso con el ajuste provisional de los bloques procesados (si ya es finito)."""
+    provisional = None
+    if est.n >= 2 and all(math.isfinite(v) for v in (est.pendiente, est.intercepcion, est.r2)):
+        provisional = {"n": est.n, "pendiente": est.pendiente, "intercepcion": est.intercepcion, "r2": est.r2}
+    trabajo.avanzar(progreso, mensaje, provisional)
+
+
+def pipeline_regresion(trabajo: Trabajo, datos_x, datos_y, metodo: str, cache=None,
+                       tam_bloque: int = TAM_BLOQUE, bootstrap: bool = False) -> dict:
+    """Validación, ajuste, intervalos y gráfico de datos ya en memoria, con progreso y cancelación.
+
+    Devuelve {'df', 'predicciones', 'resultado', 'avisos', 'error_validacion'};
+    'resultado' tiene el formato que guarda la caché de resultados. Con
+    `bootstrap` se agregan intervalos bootstrap de REPLICAS_BOOTSTRAP réplicas.
+    """
+    with recolectar() as registros:
+        trabajo.registros = registros
+        trabajo.avanzar(0.0, "Validando datos")
+        df, error_val = validar_datos(datos_x, datos_y)
+        if error_val:
+            return _salida(error_validacion=error_val)
+        return _ajustar(trabajo, df, None, metodo, cache, tam_bloque, bootstrap)
+
+
+def pipeline_archivo(trabajo: Trabajo, archivo, col_x: str, col_y: str, metodo: str, cache=None,
+                     tam_bloque: int = TAM_BLOQUE, bootstrap: bool = False) -> dict:
+    """Como pipeline_regresion, pero lee las columnas del archivo por bloques dentro del trabajo.
+
+    Las estadísticas suficientes se acumulan mientras se lee: la lectura da
+    el progreso, el ajuste provisional y, con mínimos cuadrados, el ajuste
+    final, todo en la misma pasada.
+    """
+    with recolectar() as registros:
+        trabajo.registros = registros
+        trabajo.avanzar(0.0, "Leyendo archivo")
+        total = filas_estimadas(archivo)
+        bloques_x, bloques_y = [], []
+        est = EstadisticasRegresion()
+        try:
+            with etapa("lectura_archivo") as etapa_lectura:
+                for x, y in iterar_columnas(archivo, col_x, col_y, tam_bloque):
+                    bloques_x.append(x)
+                    bloques_y.append(y)
+                    est = est.combinar(EstadisticasRegresion.desde_arrays(x, y))
+                    etapa_lectura.filas = est.n
+                    _avanzar_con(trabajo, 0.5 * min(est.n / total, 0.99) if total else 0.0,
+                                 f"Leídas {est.n:,} filas", est)
+        except TrabajoCancelado:
+            raise
+        except ImportError:
+            return _salida(error_validacion="Se necesita 'pyarrow' para leer archivos Parquet/Arrow.")
+        except (KeyError, ValueError) as e:
+            return _salida(error_validacion=f"Columna no encontrada o inválida: {e}")
+        except Exception as e:
+            return _salida(error_validacion=f"Error al leer el archivo: {e}")
+        if not bloques_x:
+            return _salida(error_validacion="El archivo no contiene filas.")
+        x_val = bloques_x[0] if len(bloques_x) == 1 else np.concatenate(bloques_x)
+        y_val = bloques_y[0] if len(bloques_y) == 1 else np.concatenate(bloques_y)
+        del bloques_x, bloques_y
+        df, error_val = validar_datos(x_val, y_val)
+        if error_val:
+            return _salida(error_validacion=error_val)
+        return _ajustar(trabajo, df, est, metodo, cache, tam_bloque, bootstrap)
+
+
+def _ajustar(trabajo: Trabajo, df, est: EstadisticasRegresion | None, metodo: str, cache,
+             tam_bloque: int, bootstrap: bool) -> dict:
+    """Caché, ajuste, intervalos y gráfico sobre datos ya validados.
+
+    `est` son las estadísticas de df si ya se acumularon al leer; si no, se
+    calculan aquí por bloques (una sola pasada que da progreso real).
+    """
+    salida = _salida(df=df)
+    x_val = df[COL_X].to_numpy()
+    y_val = df[COL_Y].to_numpy()
+
+    replicas = REPLICAS_BOOTSTRAP if bootstrap and metodo not in BACKENDS_ROBUSTOS else 0
+    trabajo.avanzar(0.5 if est is not None else 0.05, "Buscando en caché")
+    clave = None
+    if cache is not None:
+        with etapa("cache_buscar", len(x_val)):
+            clave = clave_datos(x_val, y_val, backend=metodo, max_puntos=MAX_PUNTOS_GRAFICO,
+                                replicas=replicas, formato=FORMATO_RESULTADO)
+            resultado = cache.obtener(clave)
+        if resultado is not None:
+            # Las predicciones no se guardan: se recalculan en una operación vectorizada
+            if not resultado['error_reg']:
+                salida["predicciones"] = resultado['pendiente'] * x_val + resultado['intercepcion']
+            salida["resultado"] = resultado
+            return salida
+
+    if est is None:
+        n = len(x_val)
+        est = EstadisticasRegresion()
+        with etapa("ajuste_por_bloques", n):
+            for inicio in range(0, n, tam_bloque):
+                est = est.combinar(EstadisticasRegresion.desde_arrays(x_val[inicio:inicio + tam_bloque],
+                                                                      y_val[inicio:inicio + tam_bloque]))
+                _avanzar_con(trabajo, 0.05 + 0.45 * est.n / n, f"Procesados {est.n:,} de {n:,} puntos", est)
+
+    trabajo.avanzar(0.5, "Ajuste final")
+    # r y el ajuste por mínimos cuadrados salen de las mismas estadísticas: no se recorren otra vez los datos
+    corr = est.correlacion
+    error_corr = None
+    if math.isnan(corr):
+        corr, error_corr = None, "Correlación no definida (posiblemente datos constantes)."
+    if metodo == "numpy":
+        preds, pend, r2_val, intercep, mod, error_reg = regresion_desde_estadisticas(est, x_val)
+    else:
+        preds, pend, r2_val, intercep, mod, error_reg = regresion_lineal(df, backend=metodo)
+    resultado = {'correlacion': corr, 'error_corr': error_corr, 'error_reg': error_reg,
+                 'pendiente': pend, 'r2': r2_val, 'intercepcion': intercep, 'modelo': mod, 'fig': None,
+                 'inferencia': None}
+    if not error_reg:
+        trabajo.avanzar(0.65, "Intervalos de confianza")
+        # Los intervalos analíticos y bootstrap corresponden a mínimos cuadrados
+        if metodo in BACKENDS_ROBUSTOS:
+            inferencia, error_inf = None, None
+        else:
+            inferencia, error_inf = intervalos_confianza(df, replicas=replicas, estadisticas=est)
+        if error_inf:
+            salida["avisos"].append(f"Intervalos: {error_inf}")
+        resultado['inferencia'] = inferencia
+        trabajo.avanzar(0.85, "Construyendo gráfico")
+        # La figura base no se vuelve a modificar; la predicción se dibuja sobre una copia
+        resultado['fig'] = graficar_regresion(df, preds, r2_val, banda=inferencia['banda'] if inferencia else None)
+    trabajo.avanzar(0.99, "Guardando")
+    if cache is not None and clave is not None:
+        cache.guardar(clave, resultado)
+    salida["predicciones"] = preds
+    salida["resultado"] = resultado
+    return salida